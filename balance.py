@@ -0,0 +1,168 @@
+# Modelo del balance general y su almacenamiento, independiente de la interfaz gráfica
+import re
+from dataclasses import dataclass
+from typing import Optional
+
+#Funcion para validar que la cadena tenga dos decimales
+def validar_dos_decimales(cadena):
+    return re.match(r'^\d+(\.\d{1,2})?$', cadena) is not None
+
+# Secciones del balance general: título en el formulario -> clave guardada en balance_detalle
+SECCIONES_BALANCE = {
+    "ACTIVOS CORRIENTES": "activo_corriente",
+    "ACTIVOS NO CORRIENTES": "activo_no_corriente",
+    "PASIVOS CORRIENTES": "pasivo_corriente",
+    "PASIVOS NO CORRIENTES": "pasivo_no_corriente",
+    "PATRIMONIO": "patrimonio",
+}
+
+SECCIONES_ACTIVO = ("activo_corriente", "activo_no_corriente")
+SECCIONES_PASIVO = ("pasivo_corriente", "pasivo_no_corriente")
+
+@dataclass
+class BalanceLine:
+    id: int
+    section: str
+    code: str = ""
+    name: str = ""
+    amount_text: str = ""
+    # Monto en centavos para que los totales incrementales no acumulen error de redondeo
+    cents: int = 0
+    valid: bool = True
+
+    @property
+    def amount(self) -> float:
+        return self.cents / 100
+
+class BalanceSheet:
+    # Modelo del balance general independiente de los widgets; cada fila del formulario
+    # registra su línea y los totales por sección se mantienen al cambiar cada monto
+    def __init__(self, resolve_account=None):
+        # resolve_account(section, code) devuelve el nombre de la cuenta si el código es válido
+        # para la sección o None; sin él se acepta cualquier código
+        self.resolve_account = resolve_account
+        self._next_id = 0
+        self._lines = {section: {} for section in SECCIONES_BALANCE.values()}
+        self._totals = {section: 0 for section in SECCIONES_BALANCE.values()}
+        # Se llama sin argumentos cada vez que cambia algún monto
+        self.on_change = None
+
+    def _notify(self):
+        if self.on_change is not None:
+            self.on_change()
+
+    def add_line(self, section: str) -> BalanceLine:
+        self._next_id += 1
+        line = BalanceLine(self._next_id, section)
+        self._lines[section][line.id] = line
+        return line
+
+    def update_line(self, line: BalanceLine, account_text: Optional[str] = None, amount_text: Optional[str] = None):
+        if account_text is not None:
+            # El combobox muestra "código - nombre"; un texto que no corresponde a una cuenta
+            # deja la línea sin cuenta
+            partes = account_text.split(' - ', 1)
+            code = partes[0].strip()
+            name = partes[1].strip() if len(partes) > 1 else ""
+            if code and self.resolve_account is not None:
+                name = self.resolve_account(line.section, code)
+                if name is None:
+                    code = name = ""
+            line.code = code
+            line.name = name
+        if amount_text is not None:
+            texto = amount_text.strip()
+            line.valid = not texto or validar_dos_decimales(texto)
+            cents = round(float(texto) * 100) if texto and line.valid else 0
+            self._totals[line.section] += cents - line.cents
+            line.cents = cents
+            line.amount_text = texto
+            self._notify()
+
+    def remove_line(self, line: BalanceLine):
+        if self._lines[line.section].pop(line.id, None) is not None:
+            self._totals[line.section] -= line.cents
+            self._notify()
+
+    def clear(self):
+        for section in self._lines:
+            self._lines[section].clear()
+            self._totals[section] = 0
+        self._notify()
+
+    def lines(self, section: Optional[str] = None):
+        if section is not None:
+            return list(self._lines[section].values())
+        return [line for lines in self._lines.values() for line in lines.values()]
+
+    def section_total(self, section: str) -> float:
+        return self._totals[section] / 100
+
+    @property
+    def total_activos(self) -> float:
+        return sum(self._totals[section] for section in SECCIONES_ACTIVO) / 100
+
+    @property
+    def total_pasivos(self) -> float:
+        return sum(self._totals[section] for section in SECCIONES_PASIVO) / 100
+
+    @property
+    def total_patrimonio(self) -> float:
+        return self._totals["patrimonio"] / 100
+
+    @property
+    def difference(self) -> float:
+        # Activo - (Pasivo + Patrimonio), exacto al centavo
+        activos = sum(self._totals[section] for section in SECCIONES_ACTIVO)
+        pasivos = sum(self._totals[section] for section in SECCIONES_PASIVO)
+        return (activos - pasivos - self._totals["patrimonio"]) / 100
+
+def guardar_balance_general(conn, fecha, empresa, total_activos, total_pasivos, total_patrimonio, lineas) -> int:
+    # Guarda el encabezado y sus líneas (seccion, codigo, nombre, monto) en una sola transacción
+    try:
+        cursor = conn.cursor()
+        cursor.execute('''
+        INSERT INTO balance_general (fecha, empresa, total_activos, total_pasivos, total_patrimonio)
+        VALUES (?, ?, ?, ?, ?)
+        ''', (fecha, empresa, total_activos, total_pasivos, total_patrimonio))
+        balance_id = cursor.lastrowid
+        cursor.executemany('''
+        INSERT INTO balance_detalle (balance_id, codigo, nombre, seccion, orden, monto)
+        VALUES (?, ?, ?, ?, ?, ?)
+        ''', [(balance_id, codigo, nombre, seccion, orden, monto)
+              for orden, (seccion, codigo, nombre, monto) in enumerate(lineas)])
+        conn.commit()
+        return balance_id
+    except Exception:
+        conn.rollback()
+        raise
+
+def cargar_balance_general(conn, balance_id: int):
+    # Encabezado y líneas en una sola consulta; devuelve (fecha, empresa, lineas) o None
+    cursor = conn.execute('''
+    SELECT g.fecha, g.empresa, d.seccion, d.codigo, d.nombre, d.monto
+    FROM balance_general g
+    LEFT JOIN balance_detalle d ON d.balance_id = g.id
+    WHERE g.id = ?
+    ORDER BY d.orden
+    ''', (balance_id,))
+    filas = cursor.fetchall()
+    if not filas:
+        return None
+    lineas = [(seccion, codigo, nombre, monto)
+              for _, _, seccion, codigo, nombre, monto in filas if codigo is not None]
+    return filas[0][0], filas[0][1], lineas
+
+def totales_balance_general(conn, balance_id: int):
+    # Totales guardados en el encabezado: (activos, pasivos, patrimonio) o None. Los balances
+    # guardados antes de existir balance_detalle solo tienen estos totales, sin líneas.
+    return conn.execute('''
+    SELECT total_activos, total_pasivos, total_patrimonio FROM balance_general WHERE id = ?
+    ''', (balance_id,)).fetchone()
+
+def listar_balances_generales(conn):
+    return conn.execute('''
+    SELECT id, fecha, empresa, total_activos, total_pasivos, total_patrimonio
+    FROM balance_general
+    ORDER BY id DESC
+    ''').fetchall()
@@ -0,0 +1,86 @@
+# Mide el arranque en frío de la aplicación y lo compara con benchmarks/presupuesto_arranque.json
+#
+#   python benchmarks/bench_arranque.py
+#
+# - Tiempo de importación de menu y main según python -X importtime
+# - Módulos pesados que no deben cargarse al iniciar (ReportLab, PIL, ...)
+# - Tiempo hasta el primer cuadro de la ventana principal (solo si hay pantalla)
+# Termina con código 1 si algún valor supera el presupuesto.
+import json
+import os
+import subprocess
+import sys
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PRESUPUESTO = os.path.join(os.path.dirname(os.path.abspath(__file__)), "presupuesto_arranque.json")
+
+PRIMER_CUADRO = """
+import time
+inicio = time.perf_counter()
+import menu
+ventana = menu.crear_menu_principal()
+ventana.update()
+print((time.perf_counter() - inicio) * 1000)
+ventana.destroy()
+"""
+
+def importtime(modulo, repeticiones=5):
+    # Mejor de varias corridas del tiempo acumulado de importación (ms) y módulos cargados
+    mejor = None
+    modulos = set()
+    for _ in range(repeticiones):
+        resultado = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {modulo}"],
+                                   cwd=RAIZ, capture_output=True, text=True, check=True)
+        for linea in resultado.stderr.splitlines():
+            partes = linea.split("|")
+            if len(partes) != 3 or not partes[1].strip().isdigit():
+                continue
+            nombre = partes[2].strip()
+            modulos.add(nombre.split(".")[0])
+            if nombre == modulo:
+                acumulado = int(partes[1]) / 1000
+                mejor = acumulado if mejor is None else min(mejor, acumulado)
+    return mejor, modulos
+
+def primer_cuadro(repeticiones=3):
+    mejor = None
+    for _ in range(repeticiones):
+        resultado = subprocess.run([sys.executable, "-c", PRIMER_CUADRO], cwd=RAIZ, capture_output=True, text=True)
+        if resultado.returncode != 0:
+            # Sin pantalla (por ejemplo en un servidor) no se puede crear la ventana
+            return None
+        valor = float(resultado.stdout.strip())
+        mejor = valor if mejor is None else min(mejor, valor)
+    return mejor
+
+def main():
+    with open(PRESUPUESTO, encoding="utf-8") as archivo:
+        presupuesto = json.load(archivo)
+
+    medidas = {}
+    cargados = set()
+    for modulo in ("menu", "main"):
+        medidas[f"import_{modulo}_ms"], modulos = importtime(modulo)
+        cargados |= modulos
+    medidas["primer_cuadro_ms"] = primer_cuadro()
+
+    excedidos = []
+    for clave, valor in medidas.items():
+        limite = presupuesto[clave]
+        if valor is None:
+            print(f"{clave:<20} omitido (sin pantalla)")
+            continue
+        estado = "ok" if valor <= limite else "EXCEDIDO"
+        print(f"{clave:<20} {valor:8.1f} ms  (presupuesto {limite} ms)  {estado}")
+        if valor > limite:
+            excedidos.append(clave)
+
+    prohibidos = sorted(cargados.intersection(presupuesto["modulos_prohibidos"]))
+    if prohibidos:
+        print(f"Módulos cargados al iniciar que deberían ser diferidos: {', '.join(prohibidos)}")
+        excedidos.append("modulos_prohibidos")
+
+    return 1 if excedidos else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
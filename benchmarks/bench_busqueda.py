@@ -0,0 +1,45 @@
+# Micro-benchmark de search_accounts (búsqueda por fragmentos del nombre) sobre un catálogo
+# sintético con nombres de cuentas contables
+#
+#   python benchmarks/bench_busqueda.py [cantidad de cuentas]
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from datos import generar_catalogo
+from catalogo import AccountCatalog
+
+PALABRAS = ["CAJA", "GENERAL", "CHICA", "BANCOS", "CLIENTES", "PROVEEDORES", "INVENTARIO", "MERCADERIA",
+            "DEPOSITOS", "PLAZO", "FIJO", "IMPUESTOS", "POR", "PAGAR", "COBRAR", "MOBILIARIO", "EQUIPO",
+            "VEHICULOS", "EDIFICIOS", "TERRENOS", "DEPRECIACION", "ACUMULADA", "CAPITAL", "SOCIAL", "RESERVA",
+            "LEGAL", "UTILIDADES", "RETENIDAS", "DOCUMENTOS", "ANTICIPOS", "SUELDOS", "SEGURO", "NACIONAL",
+            "EXTRANJERO", "CORTO", "LARGO", "PRESTAMOS", "INTERESES", "ALQUILERES", "SERVICIOS"]
+
+CONSULTAS = ["caja", "proveedores", "veedor", "por pagar", "deprec acum", "inventario mercaderia",
+             "banc", "capital social", "ca", "seguro nacional"]
+
+def main():
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    azar = random.Random(total)
+    filas = ((code, " ".join(azar.sample(PALABRAS, azar.randint(2, 4))), parent_code)
+             for code, _, parent_code in generar_catalogo(total))
+    with tempfile.TemporaryDirectory() as carpeta:
+        db = AccountCatalog(os.path.join(carpeta, "bench.db"))
+        resultado = db.import_accounts(filas)
+        print(f"Cuentas importadas: {resultado.imported}")
+
+        for consulta in CONSULTAS:
+            repeticiones = 20
+            inicio = time.perf_counter()
+            for _ in range(repeticiones):
+                encontradas = db.search_accounts(consulta)
+            ms = (time.perf_counter() - inicio) * 1000 / repeticiones
+            print(f"{consulta!r:<26} {ms:8.3f} ms  ({len(encontradas)} resultados)")
+        db.close()
+
+if __name__ == "__main__":
+    main()
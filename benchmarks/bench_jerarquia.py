@@ -0,0 +1,41 @@
+# Micro-benchmark de get_children, get_subtree y get_ancestors sobre un catálogo sintético
+#
+#   python benchmarks/bench_jerarquia.py [cantidad de cuentas]
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from datos import generar_catalogo, muestra_codigos
+from catalogo import AccountCatalog
+
+def medir(funcion, codigos, repeticiones=5):
+    # Devuelve el tiempo medio por consulta en milisegundos
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        for code in codigos:
+            funcion(code)
+    return (time.perf_counter() - inicio) * 1000 / (repeticiones * len(codigos))
+
+def main():
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    with tempfile.TemporaryDirectory() as carpeta:
+        db = AccountCatalog(os.path.join(carpeta, "bench.db"))
+        resultado = db.import_accounts(generar_catalogo(total))
+        print(f"Cuentas importadas: {resultado.imported}")
+
+        grupos = muestra_codigos(total, 6)
+        hojas = muestra_codigos(total, 8) or grupos
+        casos = [
+            ("get_children (nivel 6)", db.get_children, grupos),
+            ("get_subtree (nivel 6)", db.get_subtree, grupos),
+            ("get_ancestors (nivel 8)", db.get_ancestors, hojas),
+        ]
+        for nombre, funcion, codigos in casos:
+            print(f"{nombre:<28} {medir(funcion, codigos):.4f} ms por consulta")
+        db.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+# Generador de catálogos sintéticos para los benchmarks
+import itertools
+
+RAICES = ["1", "2", "3", "4", "5", "6"]
+
+def calcular_ramificacion(total: int) -> int:
+    # Hijos por nodo para que los niveles 2/4/6/8 sumen aproximadamente el total pedido
+    for ramificacion in range(1, 100):
+        niveles = 9 * len(RAICES)
+        estimado = niveles * (1 + ramificacion + ramificacion ** 2 + ramificacion ** 3)
+        if estimado >= total:
+            return ramificacion
+    return 99
+
+def generar_catalogo(total: int):
+    # Filas (código, nombre, código padre) respetando la jerarquía de 1/2/4/6/8 dígitos;
+    # cada padre aparece antes que sus hijos
+    ramificacion = calcular_ramificacion(total)
+    nivel = []
+    for raiz in RAICES:
+        for digito in range(1, 10):
+            nivel.append((raiz + str(digito), raiz))
+    generadas = 0
+    while nivel:
+        siguiente = []
+        for code, parent_code in nivel:
+            if generadas >= total:
+                return
+            yield code, f"CUENTA {code}", parent_code
+            generadas += 1
+            if len(code) < 8:
+                for hijo in range(1, ramificacion + 1):
+                    siguiente.append((f"{code}{hijo:02d}", code))
+        nivel = siguiente
+
+def muestra_codigos(total: int, longitud: int, cantidad: int = 200):
+    codigos = [code for code, _, _ in generar_catalogo(total) if len(code) == longitud]
+    paso = max(1, len(codigos) // cantidad)
+    return list(itertools.islice(codigos[::paso], cantidad))
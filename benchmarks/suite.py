@@ -0,0 +1,182 @@
+# Suite de benchmarks de los caminos críticos del catálogo, el balance y los PDF
+#
+#   python benchmarks/suite.py [--tamanos 1000 10000 100000 1000000] [--salida resultados.json]
+#   python benchmarks/suite.py --comparar base.json nuevo.json [--tolerancia 0.25]
+#
+# Los resultados se guardan en JSON ({"metadatos": ..., "resultados": {caso: ms}}) para
+# poder comparar dos commits; --comparar termina con código 1 si algún caso empeoró más
+# que la tolerancia.
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from datos import generar_catalogo
+from catalogo import AccountCatalog
+from balance import SECCIONES_BALANCE, BalanceSheet
+
+def medir(funcion, repeticiones=5):
+    # Mediana en milisegundos de varias corridas
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+    return statistics.median(tiempos)
+
+# Corridas de los casos que modifican la base de datos; cada una parte de una base nueva
+REPETICIONES_EN_FRIO = 3
+
+def casos_catalogo(carpeta, total, resultados):
+    filas = list(generar_catalogo(total))
+    # Altas nuevas debajo de una cuenta de nivel 6; los sufijos 50-99 no los usa el generador
+    padre = next(code for code, _, _ in filas if len(code) == 6)
+
+    # Importar, dar de alta y la primera consulta por sección (que genera el catálogo compacto)
+    # no se pueden repetir sobre la misma base: se mide cada uno en varias bases nuevas y se
+    # toma la mediana, para que --comparar no dependa de una sola corrida
+    tiempos = {"importar": [], "altas": [], "primera": []}
+    db = None
+    for repeticion in range(REPETICIONES_EN_FRIO):
+        if db is not None:
+            db.close()
+        ruta = os.path.join(carpeta, f"catalogo_{total}_{repeticion}.db")
+        db = AccountCatalog(ruta)
+
+        inicio = time.perf_counter()
+        db.import_accounts(filas)
+        tiempos["importar"].append((time.perf_counter() - inicio) * 1000)
+
+        inicio = time.perf_counter()
+        for sufijo in range(50, 100):
+            db.create_account(f"{padre}{sufijo}", "NUEVA", padre)
+        tiempos["altas"].append((time.perf_counter() - inicio) * 1000)
+
+        # Filtro por sección de agregar_cuenta
+        inicio = time.perf_counter()
+        db.get_descendants("11")
+        tiempos["primera"].append((time.perf_counter() - inicio) * 1000)
+
+    resultados[f"catalogo.import_accounts[{total}]"] = statistics.median(tiempos["importar"])
+    resultados[f"catalogo.create_account[{total}] (x50)"] = statistics.median(tiempos["altas"])
+    resultados[f"balance.filtro_seccion_primera[{total}]"] = statistics.median(tiempos["primera"])
+
+    resultados[f"catalogo.get_all_accounts[{total}]"] = medir(db.get_all_accounts, 3)
+    resultados[f"catalogo.iter_accounts[{total}]"] = medir(lambda: sum(1 for _ in db.iter_accounts()), 3)
+
+    muestra = random.Random(total).sample([code for code, _, _ in filas], min(500, len(filas)))
+    resultados[f"catalogo.buscar_cuenta_por_codigo[{total}] (x{len(muestra)})"] = medir(
+        lambda: [db.buscar_cuenta_por_codigo(code) for code in muestra])
+
+    # Otra instancia abre el catálogo compacto ya guardado junto a la base de datos
+    def abrir_compacto():
+        otro = AccountCatalog(ruta)
+        otro.snapshot()
+        otro.close()
+    resultados[f"catalogo.abrir_compacto[{total}]"] = medir(abrir_compacto)
+    seleccionadas = {code for code, _, _ in filas[:200]}
+    resultados[f"balance.filtro_seccion[{total}]"] = medir(
+        lambda: [db.get_descendants(prefijo, seleccionadas) for prefijo in ("11", "12", "21", "22", "3")])
+
+    # Selector con búsqueda: una pulsación por caso, incluido un texto que no aparece
+    for texto in ("1", "1101", "cuenta 11", "zzz"):
+        resultados[f"balance.selector_tecla[{total}] ({texto!r})"] = medir(
+            lambda: db.filter_descendants("1", texto, seleccionadas), 20)
+    db.close()
+
+def casos_totales(lineas, resultados):
+    secciones = list(SECCIONES_BALANCE.values())
+
+    def escribir_montos():
+        balance = BalanceSheet()
+        for i in range(lineas):
+            linea = balance.add_line(secciones[i % len(secciones)])
+            balance.update_line(linea, f"{110000 + i} - CUENTA", f"{i % 1000}.{i % 100:02d}")
+        return balance.total_activos, balance.total_pasivos, balance.total_patrimonio
+
+    resultados[f"balance.totales[{lineas}]"] = medir(escribir_montos)
+
+def casos_pdf(carpeta, lineas, resultados):
+    try:
+        from reportes import construir_pdf_balance
+    except ImportError:
+        return  # ReportLab no está instalado
+    secciones = list(SECCIONES_BALANCE.values())
+    datos = [(secciones[i % len(secciones)], f"{110000 + i}", f"CUENTA {i}", float(i % 1000) + 0.5)
+             for i in range(lineas)]
+    ruta = os.path.join(carpeta, f"balance_{lineas}.pdf")
+    resultados[f"pdf.construir_pdf_balance[{lineas}]"] = medir(
+        lambda: construir_pdf_balance(ruta, "EMPRESA", "31/12/2024", datos), 3)
+
+def commit_actual():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+def ejecutar(tamanos):
+    resultados = {}
+    with tempfile.TemporaryDirectory() as carpeta:
+        for total in tamanos:
+            print(f"Catálogo de {total} cuentas...", file=sys.stderr)
+            casos_catalogo(carpeta, total, resultados)
+        for lineas in (50, 500, 5000):
+            casos_totales(lineas, resultados)
+            casos_pdf(carpeta, lineas, resultados)
+    return {
+        "metadatos": {
+            "commit": commit_actual(),
+            "python": platform.python_version(),
+            "plataforma": platform.platform(),
+            "fecha": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "resultados": resultados,
+    }
+
+def comparar(ruta_base, ruta_nueva, tolerancia):
+    with open(ruta_base, encoding="utf-8") as archivo:
+        base = json.load(archivo)["resultados"]
+    with open(ruta_nueva, encoding="utf-8") as archivo:
+        nueva = json.load(archivo)["resultados"]
+
+    regresiones = 0
+    for caso in sorted(set(base) & set(nueva)):
+        cambio = (nueva[caso] - base[caso]) / base[caso] if base[caso] else 0.0
+        marca = ""
+        if cambio > tolerancia:
+            marca = "  REGRESIÓN"
+            regresiones += 1
+        print(f"{caso:<55} {base[caso]:10.2f} -> {nueva[caso]:10.2f} ms  {cambio:+7.1%}{marca}")
+    return 1 if regresiones else 0
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks del catálogo, el balance y los PDF")
+    parser.add_argument("--tamanos", type=int, nargs="+", default=[1000, 10000, 100000],
+                        help="Cantidad de cuentas de cada catálogo sintético")
+    parser.add_argument("--salida", help="Archivo JSON de resultados (por defecto, la salida estándar)")
+    parser.add_argument("--comparar", nargs=2, metavar=("BASE", "NUEVO"), help="Compara dos archivos de resultados")
+    parser.add_argument("--tolerancia", type=float, default=0.25, help="Empeoramiento relativo permitido")
+    args = parser.parse_args()
+
+    if args.comparar:
+        return comparar(args.comparar[0], args.comparar[1], args.tolerancia)
+
+    informe = json.dumps(ejecutar(args.tamanos), indent=2, ensure_ascii=False)
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as archivo:
+            archivo.write(informe + "\n")
+    else:
+        print(informe)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
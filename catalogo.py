@@ -0,0 +1,723 @@
+# Catálogo de cuentas: almacenamiento en SQLite, migraciones del esquema e índices en memoria
+import bisect
+import csv
+import heapq
+import itertools
+import os
+import queue
+import threading
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Optional
+
+from catalogo_compacto import CatalogoCompacto, clave_busqueda, normalizar_busqueda, rango_coincidencias
+from diagnostico import conectar
+from migraciones import migrar
+
+@dataclass
+class Account:
+    # Sin __dict__ por instancia: se crean miles al recorrer el catálogo
+    __slots__ = ("code", "name", "parent_code")
+    code: str
+    name: str
+    parent_code: Optional[str]
+
+@dataclass
+class AccountChange:
+    # kind: "inserted", "updated", "deleted" o "reset" (cambio masivo, hay que recargar).
+    # code es la clave que tenía la cuenta; account trae los valores nuevos y previous los
+    # anteriores (al editar o eliminar)
+    kind: str
+    code: Optional[str] = None
+    account: Optional[Account] = None
+    previous: Optional[Account] = None
+
+class AccountPrefixIndex:
+    # Índice de códigos ordenados para consultar descendientes por prefijo con bisect;
+    # keys va alineado con codes para filtrar por nombre sin recalcular minúsculas
+    def __init__(self, accounts=()):
+        self.codes = []
+        self.keys = []
+        self.names = {}
+        self.parents = {}
+        for account in sorted(accounts, key=lambda a: a.code):
+            self.codes.append(account.code)
+            self.keys.append(clave_busqueda(account.code, account.name))
+            self.names[account.code] = account.name
+            self.parents[account.code] = account.parent_code
+
+    def add(self, account: Account):
+        posicion = bisect.bisect_left(self.codes, account.code)
+        if account.code not in self.names:
+            self.codes.insert(posicion, account.code)
+            self.keys.insert(posicion, clave_busqueda(account.code, account.name))
+        else:
+            self.keys[posicion] = clave_busqueda(account.code, account.name)
+        self.names[account.code] = account.name
+        self.parents[account.code] = account.parent_code
+
+    def remove(self, code: str):
+        if code in self.names:
+            posicion = bisect.bisect_left(self.codes, code)
+            del self.codes[posicion]
+            del self.keys[posicion]
+            del self.names[code]
+            del self.parents[code]
+
+    def matching(self, prefix: str, text: str = "", exclude=()):
+        # Generador de descendientes de prefix que coinciden con lo escrito: un código se
+        # acota con bisect y cualquier otro texto se busca dentro de "código - nombre"
+        text = text.strip()
+        rango = rango_coincidencias(self.codes, prefix, text)
+        if rango is None:
+            return
+        start, end = rango
+        filtro = normalizar_busqueda(text) if text and not text.isdigit() else None
+
+        codes, keys = self.codes, self.keys
+        for posicion in range(start, end):
+            code = codes[posicion]
+            if code in exclude or (filtro is not None and filtro not in keys[posicion]):
+                continue
+            yield Account(code, self.names[code], self.parents[code])
+
+class SnapshotPrefixIndex:
+    # Misma interfaz que AccountPrefixIndex sobre un CatalogoCompacto inmutable. Las altas,
+    # ediciones y bajas posteriores van a un AccountPrefixIndex pequeño y los códigos que
+    # cambiaron se ocultan del catálogo compacto; las consultas combinan ambos en orden.
+    def __init__(self, compacto: CatalogoCompacto):
+        self.compacto = compacto
+        self.cambios = AccountPrefixIndex()
+        self.ocultos = set()
+
+    def add(self, account: Account):
+        if account.code in self.compacto:
+            self.ocultos.add(account.code)
+        self.cambios.add(account)
+
+    def remove(self, code: str):
+        self.ocultos.add(code)
+        self.cambios.remove(code)
+
+    def descendants(self, prefix: str, exclude=()):
+        return list(self.matching(prefix, "", exclude))
+
+    def matching(self, prefix: str, text: str = "", exclude=()):
+        ocultos = self.ocultos
+        base = (Account(code, name, parent_code)
+                for code, name, parent_code in self.compacto.matching(prefix, text)
+                if code not in ocultos and code not in exclude)
+        return heapq.merge(base, self.cambios.matching(prefix, text, exclude), key=lambda account: account.code)
+
+@dataclass
+class ImportResult:
+    imported: int = 0
+    # Lista de (número de fila, código, motivo del rechazo)
+    errors: list = field(default_factory=list)
+    # Motivo por el que se dejó de leer el origen antes del final, si lo hubo
+    read_error: Optional[str] = None
+
+def leer_filas_catalogo(origen):
+    # Devuelve (número de fila, fila) desde un CSV, un XLSX o cualquier iterable de filas
+    if isinstance(origen, (str, os.PathLike)):
+        ruta = os.fspath(origen)
+        if ruta.lower().endswith(".xlsx"):
+            try:
+                from openpyxl import load_workbook
+            except ImportError:
+                raise RuntimeError("Se necesita openpyxl para importar archivos .xlsx")
+            libro = load_workbook(ruta, read_only=True)
+            try:
+                for numero, fila in enumerate(libro.active.iter_rows(values_only=True), start=1):
+                    yield numero, fila
+            finally:
+                libro.close()
+        else:
+            with open(ruta, newline="", encoding="utf-8-sig") as archivo:
+                for numero, fila in enumerate(csv.reader(archivo), start=1):
+                    yield numero, fila
+    else:
+        yield from enumerate(origen, start=1)
+
+# Ruta de la base de datos del catálogo
+DB_PATH = "catalogo_cuentas.db"
+
+CUENTAS_PRINCIPALES = [
+    ("1", "ACTIVO", None),
+    ("2", "PASIVO", None),
+    ("3", "PATRIMONIO", None),
+    ("4", "CUENTAS DE RESULTADO DEUDORAS", None),
+    ("5", "CUENTAS DE RESULTADO ACREEDORAS", None),
+    ("6", "CUENTA DE PUENTE DE CIERRE", None)
+]
+
+def _migracion_catalogo(cursor):
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS accounts (
+        code TEXT PRIMARY KEY,
+        name TEXT NOT NULL,
+        parent_code TEXT,
+        FOREIGN KEY (parent_code) REFERENCES accounts (code)
+    )
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_accounts_parent_code ON accounts (parent_code)')
+    cursor.executemany('''
+    INSERT OR IGNORE INTO accounts (code, name, parent_code)
+    VALUES (?, ?, ?)
+    ''', CUENTAS_PRINCIPALES)
+
+def _migracion_balance_general(cursor):
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS balance_general (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        fecha TEXT,
+        empresa TEXT,
+        total_activos REAL,
+        total_pasivos REAL,
+        total_patrimonio REAL,
+        fecha_registro TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_balance_general_empresa_fecha ON balance_general (empresa, fecha)')
+
+def _migracion_balance_detalle(cursor):
+    # Líneas de cada balance guardado; la llave agrupa físicamente las líneas de un mismo balance
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS balance_detalle (
+        balance_id INTEGER NOT NULL REFERENCES balance_general (id) ON DELETE CASCADE,
+        codigo TEXT NOT NULL,
+        nombre TEXT NOT NULL,
+        seccion TEXT NOT NULL,
+        orden INTEGER NOT NULL,
+        monto REAL NOT NULL,
+        PRIMARY KEY (balance_id, codigo)
+    ) WITHOUT ROWID
+    ''')
+    # Para consultar una misma cuenta a través de varios periodos
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_balance_detalle_codigo ON balance_detalle (codigo, balance_id)')
+
+def _migracion_busqueda_nombres(cursor):
+    # Índice de texto completo sobre accounts.name. El tokenizador trigram permite buscar
+    # cualquier fragmento de 3 o más letras; los disparadores lo mantienen sincronizado.
+    cursor.execute('''
+    CREATE VIRTUAL TABLE IF NOT EXISTS accounts_fts USING fts5(
+        name, content='accounts', content_rowid='rowid', tokenize='trigram'
+    )
+    ''')
+    cursor.execute('''
+    CREATE TRIGGER IF NOT EXISTS accounts_fts_insert AFTER INSERT ON accounts BEGIN
+        INSERT INTO accounts_fts (rowid, name) VALUES (new.rowid, new.name);
+    END
+    ''')
+    cursor.execute('''
+    CREATE TRIGGER IF NOT EXISTS accounts_fts_delete AFTER DELETE ON accounts BEGIN
+        INSERT INTO accounts_fts (accounts_fts, rowid, name) VALUES ('delete', old.rowid, old.name);
+    END
+    ''')
+    cursor.execute('''
+    CREATE TRIGGER IF NOT EXISTS accounts_fts_update AFTER UPDATE OF name ON accounts BEGIN
+        INSERT INTO accounts_fts (accounts_fts, rowid, name) VALUES ('delete', old.rowid, old.name);
+        INSERT INTO accounts_fts (rowid, name) VALUES (new.rowid, new.name);
+    END
+    ''')
+    cursor.execute("INSERT INTO accounts_fts (accounts_fts) VALUES ('rebuild')")
+
+def _migracion_contador_cambios(cursor):
+    # Contador que sube con cada cambio en accounts; identifica la versión del catálogo
+    # compacto guardado junto a la base de datos
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS catalogo_cambios (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        contador INTEGER NOT NULL
+    )
+    ''')
+    cursor.execute('INSERT OR IGNORE INTO catalogo_cambios (id, contador) VALUES (1, 0)')
+    for evento in ("INSERT", "UPDATE", "DELETE"):
+        cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS accounts_cambios_{evento.lower()} AFTER {evento} ON accounts BEGIN
+            UPDATE catalogo_cambios SET contador = contador + 1 WHERE id = 1;
+        END
+        ''')
+
+# Migraciones en orden; la versión del esquema (PRAGMA user_version) es la cantidad aplicada.
+# Usan IF NOT EXISTS para poder adoptar bases de datos creadas antes de versionar el esquema.
+MIGRACIONES = [
+    _migracion_catalogo,
+    _migracion_balance_general,
+    _migracion_balance_detalle,
+    _migracion_busqueda_nombres,
+    _migracion_contador_cambios,
+]
+
+def migrar_base_datos(conn) -> int:
+    return migrar(conn, MIGRACIONES)
+
+class AccountCatalog:
+    def __init__(self, db_path: str):
+        # Una sola conexión por catálogo; sqlite3 guarda en caché las sentencias preparadas
+        self.conn = conectar(db_path, cached_statements=256)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        # Catálogo compacto junto a la base de datos (no aplica a bases en memoria)
+        self.snapshot_path = None if db_path == ":memory:" else f"{db_path}.snapshot"
+        self._prefix_index = None
+        # Cantidad de hijos por código, para dibujar las flechas del árbol sin cargar subárboles
+        self._child_counts = {}
+        # Funciones que reciben cada lote de AccountChange después de confirmarse
+        self.listeners = []
+        migrar_base_datos(self.conn)
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+    def clear_caches(self):
+        # Para cuando otra conexión modificó las cuentas
+        self._prefix_index = None
+        self._child_counts.clear()
+
+    def subscribe(self, listener):
+        self.listeners.append(listener)
+        return listener
+
+    def unsubscribe(self, listener):
+        if listener in self.listeners:
+            self.listeners.remove(listener)
+
+    def apply_changes(self, changes):
+        # Actualiza los índices en memoria con cada cambio y avisa a los suscriptores; también
+        # sirve para cambios hechos con otra conexión (el hilo de la base de datos)
+        for change in changes:
+            if change.kind == "reset":
+                self.clear_caches()
+                continue
+            if self._prefix_index is not None:
+                if change.kind in ("updated", "deleted"):
+                    self._prefix_index.remove(change.code)
+                if change.kind in ("inserted", "updated"):
+                    self._prefix_index.add(change.account)
+            # Los conteos afectados se vuelven a consultar cuando se pidan
+            for account in (change.account, change.previous):
+                if account is not None:
+                    self._child_counts.pop(account.code, None)
+                    self._child_counts.pop(account.parent_code, None)
+        for listener in list(self.listeners):
+            listener(changes)
+
+    def validate_account_code(self, code: str, parent_code: str) -> bool:
+        if not code.isdigit():
+            return False
+
+        if parent_code and not code.startswith(parent_code):
+            return False
+
+        if len(code) not in [1, 2, 4, 6, 8]:
+            return False
+
+        return True
+
+    def create_account(self, code: str, name: str, parent_code: str) -> bool:
+        try:
+            if not self.validate_account_code(code, parent_code):
+                return False
+
+            cursor = self.conn.cursor()
+            cursor.execute('''
+            INSERT INTO accounts (code, name, parent_code)
+            VALUES (?, ?, ?)
+            ''', (code, name, parent_code if parent_code else None))
+
+            self.conn.commit()
+            self.apply_changes([AccountChange("inserted", code, Account(code, name, parent_code if parent_code else None))])
+            return True
+
+        except Exception as e:
+            self.conn.rollback()
+            print(f"Error al crear la cuenta: {e}")
+            return False
+
+    def import_accounts(self, origen, chunk_size: int = 5000) -> ImportResult:
+        # Importa filas (código, nombre, código padre) validándolas contra los códigos en memoria
+        result = ImportResult()
+        codigos = {row[0] for row in self.conn.execute('SELECT code FROM accounts')}
+        lote = []
+
+        def escribir_lote():
+            try:
+                self.conn.executemany('''
+                INSERT INTO accounts (code, name, parent_code)
+                VALUES (?, ?, ?)
+                ''', lote)
+                self.conn.commit()
+            except Exception:
+                self.conn.rollback()
+                raise
+            result.imported += len(lote)
+            lote.clear()
+
+        filas = leer_filas_catalogo(origen)
+        try:
+            while True:
+                # Solo los errores al leer el origen se informan en el resultado; los de la base
+                # de datos se propagan
+                try:
+                    numero, fila = next(filas)
+                except StopIteration:
+                    break
+                except Exception as e:
+                    result.read_error = str(e) or type(e).__name__
+                    break
+                valores = [str(valor).strip() if valor is not None else "" for valor in fila]
+                valores += [""] * (3 - len(valores))
+                code, name, parent_code = valores[:3]
+
+                if not code and not name:
+                    continue
+                # Se omite la fila de encabezados
+                if numero == 1 and not code.isdigit():
+                    continue
+
+                if not name:
+                    result.errors.append((numero, code, "El nombre es obligatorio"))
+                elif not self.validate_account_code(code, parent_code):
+                    result.errors.append((numero, code, "Formato de código inválido"))
+                elif code in codigos:
+                    result.errors.append((numero, code, "El código ya existe"))
+                elif parent_code and parent_code not in codigos:
+                    result.errors.append((numero, code, "El código padre no existe"))
+                else:
+                    codigos.add(code)
+                    lote.append((code, name, parent_code if parent_code else None))
+                    if len(lote) >= chunk_size:
+                        escribir_lote()
+
+            # Lo leído antes de un error de lectura también se guarda
+            if lote:
+                escribir_lote()
+        finally:
+            # Los lotes ya confirmados quedan aunque falle algo después: los índices se
+            # reconstruyen en la siguiente consulta y las vistas se recargan
+            if result.imported:
+                self.apply_changes([AccountChange("reset")])
+        return result
+
+    def buscar_cuenta_por_codigo(self, code: str) -> Optional[Account]:
+        cursor = self.conn.cursor()
+        cursor.execute('SELECT code, name, parent_code FROM accounts WHERE code = ?', (code,))
+        row = cursor.fetchone()
+        if row:
+            return Account(code=row[0], name=row[1], parent_code=row[2])
+        return None
+
+    def editar_cuenta(self, codigo_original: str, nuevo_codigo: str, nuevo_nombre: str, nuevo_padre: str) -> bool:
+        try:
+            if not self.validate_account_code(nuevo_codigo, nuevo_padre):
+                return False
+
+            cursor = self.conn.cursor()
+            anterior = self.buscar_cuenta_por_codigo(codigo_original)
+
+            # Si la cuenta tiene subcuentas, el nuevo código debe conservar el largo
+            # para que los descendientes sigan respetando la jerarquía de 1/2/4/6/8 dígitos
+            if nuevo_codigo != codigo_original and len(nuevo_codigo) != len(codigo_original):
+                cursor.execute('SELECT 1 FROM accounts WHERE code > ? AND code < ? LIMIT 1',
+                               (codigo_original, codigo_original + ":"))
+                if cursor.fetchone():
+                    return False
+
+            padre = nuevo_padre if nuevo_padre else None
+            if nuevo_codigo == codigo_original:
+                # Solo cambian el nombre o el padre: una fila, los descendientes no se tocan
+                cursor.execute('UPDATE accounts SET name = ?, parent_code = ? WHERE code = ?',
+                               (nuevo_nombre, padre, codigo_original))
+                cambiadas = cursor.rowcount
+            else:
+                # Una sola sentencia recodifica todo el subárbol sustituyendo el prefijo;
+                # SQLite evalúa las expresiones con los valores anteriores de cada fila. El
+                # nombre va aparte y solo en la cuenta editada, para que el disparador del
+                # índice de texto no reconstruya las filas de los descendientes.
+                cursor.execute('''
+                UPDATE accounts
+                SET code = :nuevo || substr(code, :largo + 1),
+                    parent_code = CASE WHEN code = :original THEN :padre
+                                       ELSE :nuevo || substr(parent_code, :largo + 1) END
+                WHERE code >= :original AND code < :original || ':'
+                ''', {
+                    "original": codigo_original,
+                    "nuevo": nuevo_codigo,
+                    "largo": len(codigo_original),
+                    "padre": padre,
+                })
+                cambiadas = cursor.rowcount
+                if cambiadas and (anterior is None or anterior.name != nuevo_nombre):
+                    cursor.execute('UPDATE accounts SET name = ? WHERE code = ?', (nuevo_nombre, nuevo_codigo))
+
+            self.conn.commit()
+            if cambiadas > 1:
+                # Se recodificó un subárbol completo
+                self.apply_changes([AccountChange("reset")])
+            elif cambiadas > 0:
+                # Una sola cuenta, o el mismo código: los descendientes no cambian
+                self.apply_changes([AccountChange("updated", codigo_original,
+                                                  Account(nuevo_codigo, nuevo_nombre, padre),
+                                                  anterior)])
+            return cambiadas > 0
+
+        except Exception as e:
+            self.conn.rollback()
+            print(f"Error al editar la cuenta: {e}")
+            return False
+
+    def eliminar_cuenta(self, code: str) -> bool:
+        try:
+            anterior = self.buscar_cuenta_por_codigo(code)
+            cursor = self.conn.cursor()
+            cursor.execute('DELETE FROM accounts WHERE code = ?', (code,))
+            self.conn.commit()
+            if cursor.rowcount > 0:
+                self.apply_changes([AccountChange("deleted", code, previous=anterior)])
+            return cursor.rowcount > 0
+        except Exception as e:
+            self.conn.rollback()
+            print(f"Error al eliminar la cuenta: {e}")
+            return False
+
+    def get_all_accounts(self):
+        cursor = self.conn.cursor()
+        cursor.execute('SELECT code, name, parent_code FROM accounts ORDER BY code')
+        return [Account(code, name, parent_code) for code, name, parent_code in cursor.fetchall()]
+
+    def iter_accounts(self, prefix: Optional[str] = None, batch_size: int = 1000):
+        # Recorre el catálogo (o el subárbol de prefix) en orden de código trayendo lotes
+        # con fetchmany, así la memoria no crece con el tamaño del catálogo
+        cursor = self.conn.cursor()
+        if prefix is None:
+            cursor.execute('SELECT code, name, parent_code FROM accounts ORDER BY code')
+        else:
+            cursor.execute('''
+            SELECT code, name, parent_code FROM accounts
+            WHERE code >= ? AND code < ? || ':'
+            ORDER BY code
+            ''', (prefix, prefix))
+        try:
+            while True:
+                filas = cursor.fetchmany(batch_size)
+                if not filas:
+                    break
+                for code, name, parent_code in filas:
+                    yield Account(code, name, parent_code)
+        finally:
+            cursor.close()
+
+    def get_accounts_page(self, after_code: Optional[str] = None, limit: int = 200):
+        # Paginación por clave: usa el índice de la llave primaria en lugar de OFFSET
+        cursor = self.conn.cursor()
+        if after_code is None:
+            cursor.execute('SELECT code, name, parent_code FROM accounts ORDER BY code LIMIT ?', (limit,))
+        else:
+            cursor.execute('SELECT code, name, parent_code FROM accounts WHERE code > ? ORDER BY code LIMIT ?',
+                           (after_code, limit))
+        return [Account(code, name, parent_code) for code, name, parent_code in cursor.fetchall()]
+
+    def get_children(self, code: Optional[str]):
+        # Sin código devuelve las cuentas raíz; usa el índice sobre parent_code
+        cursor = self.conn.cursor()
+        if code is None:
+            cursor.execute('SELECT code, name, parent_code FROM accounts WHERE parent_code IS NULL ORDER BY code')
+        else:
+            cursor.execute('SELECT code, name, parent_code FROM accounts WHERE parent_code = ? ORDER BY code', (code,))
+        return [Account(code, name, parent_code) for code, name, parent_code in cursor.fetchall()]
+
+    def get_subtree(self, code: str):
+        # La cuenta y todos sus descendientes: rango [code, code + ':') sobre la llave primaria
+        cursor = self.conn.cursor()
+        cursor.execute('SELECT code, name, parent_code FROM accounts WHERE code >= ? AND code < ? ORDER BY code',
+                       (code, code + ":"))
+        return [Account(code, name, parent_code) for code, name, parent_code in cursor.fetchall()]
+
+    def get_ancestors(self, code: str):
+        # Sube por parent_code con un CTE recursivo; devuelve desde la raíz hasta el padre directo
+        cursor = self.conn.cursor()
+        cursor.execute('''
+        WITH RECURSIVE ancestros(code, name, parent_code, nivel) AS (
+            SELECT a.code, a.name, a.parent_code, 1
+            FROM accounts a
+            WHERE a.code = (SELECT parent_code FROM accounts WHERE code = ?)
+            UNION ALL
+            SELECT a.code, a.name, a.parent_code, ancestros.nivel + 1
+            FROM accounts a JOIN ancestros ON a.code = ancestros.parent_code
+        )
+        SELECT code, name, parent_code FROM ancestros ORDER BY nivel DESC
+        ''', (code,))
+        return [Account(code, name, parent_code) for code, name, parent_code in cursor.fetchall()]
+
+    def count_children(self, codes):
+        faltantes = [code for code in codes if code not in self._child_counts]
+        # Se consulta por bloques para no superar el límite de parámetros de SQLite
+        for i in range(0, len(faltantes), 500):
+            bloque = faltantes[i:i + 500]
+            for code in bloque:
+                self._child_counts[code] = 0
+            marcadores = ",".join("?" * len(bloque))
+            cursor = self.conn.execute(
+                f'SELECT parent_code, COUNT(*) FROM accounts WHERE parent_code IN ({marcadores}) GROUP BY parent_code',
+                bloque)
+            self._child_counts.update(cursor.fetchall())
+        return {code: self._child_counts[code] for code in codes}
+
+    def count_accounts(self) -> int:
+        return self.conn.execute('SELECT COUNT(*) FROM accounts').fetchone()[0]
+
+    def search_accounts(self, texto: str, limit: int = 50):
+        # Búsqueda mientras se escribe: por prefijo de código si el texto es numérico y por
+        # fragmentos del nombre en los demás casos, las mejores coincidencias primero
+        texto = texto.strip()
+        if not texto:
+            return []
+        cursor = self.conn.cursor()
+        if texto.isdigit():
+            cursor.execute('''
+            SELECT code, name, parent_code FROM accounts
+            WHERE code >= ? AND code < ? || ':'
+            ORDER BY code LIMIT ?
+            ''', (texto, texto, limit))
+        else:
+            # Cada palabra de 3 o más letras es una frase del índice (se combinan con AND).
+            # Orden: nombres que empiezan con la primera palabra y luego los más cortos, donde
+            # el fragmento pesa más; bm25 cuesta varias veces más con miles de coincidencias.
+            palabras = [palabra for palabra in texto.split() if len(palabra) >= 3]
+            if palabras:
+                cursor.execute('''
+                SELECT a.code, a.name, a.parent_code
+                FROM accounts_fts JOIN accounts a ON a.rowid = accounts_fts.rowid
+                WHERE accounts_fts MATCH ?
+                ORDER BY substr(a.name, 1, length(?)) = ? COLLATE NOCASE DESC, length(a.name), a.code
+                LIMIT ?
+                ''', (" ".join('"' + palabra.replace('"', '""') + '"' for palabra in palabras),
+                      palabras[0], palabras[0], limit))
+            else:
+                # Menos de 3 letras: el índice trigram no aplica y se recorre por código
+                patron = texto.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+                cursor.execute('''
+                SELECT code, name, parent_code FROM accounts
+                WHERE name LIKE ? ESCAPE '\\'
+                ORDER BY code LIMIT ?
+                ''', (f"%{patron}%", limit))
+        return [Account(code, name, parent_code) for code, name, parent_code in cursor.fetchall()]
+
+    def change_counter(self) -> int:
+        return self.conn.execute('SELECT contador FROM catalogo_cambios WHERE id = 1').fetchone()[0]
+
+    def snapshot(self) -> CatalogoCompacto:
+        # Abre el catálogo compacto guardado si corresponde al contador de cambios actual;
+        # si no, lo genera desde la base de datos y lo deja guardado para el próximo inicio
+        contador = self.change_counter()
+        if self.snapshot_path is not None:
+            compacto = CatalogoCompacto.abrir(self.snapshot_path, contador)
+            if compacto is not None:
+                return compacto
+
+        cursor = self.conn.execute('SELECT code, name, parent_code FROM accounts ORDER BY code')
+        compacto = CatalogoCompacto.desde_filas(cursor, contador)
+        if self.snapshot_path is not None:
+            try:
+                compacto.escribir(self.snapshot_path)
+            except OSError as e:
+                # Por ejemplo, en Windows no se puede reemplazar un archivo abierto con mmap
+                print(f"No se pudo guardar el catálogo compacto: {e}")
+        return compacto
+
+    def _index(self):
+        # El índice se abre una sola vez y se mantiene con cada alta, edición o baja
+        if self._prefix_index is None:
+            self._prefix_index = SnapshotPrefixIndex(self.snapshot())
+        return self._prefix_index
+
+    def get_descendants(self, prefix: str, exclude=()):
+        return self._index().descendants(prefix, exclude)
+
+    def filter_descendants(self, prefix: str, text: str = "", exclude=(), limit: int = 50):
+        # Candidatos para el selector de cuentas; se detiene al llegar al límite
+        return list(itertools.islice(self._index().matching(prefix, text, exclude), limit))
+
+# Catálogo compartido por todas las vistas durante la vida del proceso
+_catalogo: Optional[AccountCatalog] = None
+
+def obtener_catalogo() -> AccountCatalog:
+    global _catalogo
+    if _catalogo is None:
+        _catalogo = AccountCatalog(DB_PATH)
+    return _catalogo
+
+class TrabajadorCatalogo:
+    # Hilo dedicado con su propia conexión al catálogo. Las operaciones se encolan en orden
+    # y cada una devuelve un Future con el resultado de funcion(catalogo, *args).
+    def __init__(self, db_path: str):
+        self._cola = queue.Queue()
+        self._hilo = threading.Thread(target=self._bucle, args=(db_path,), name="catalogo-db", daemon=True)
+        self._hilo.start()
+
+    def enviar(self, funcion, *args, **kwargs) -> Future:
+        futuro = Future()
+        self._cola.put((futuro, funcion, args, kwargs))
+        return futuro
+
+    def cerrar(self):
+        # Termina después de las operaciones ya encoladas
+        self._cola.put(None)
+        self._hilo.join()
+
+    def _bucle(self, db_path):
+        catalogo = None
+        error_apertura = None
+        # Cambios de la operación en curso; se entregan en futuro.cambios para aplicarlos
+        # al catálogo del hilo de la interfaz
+        cambios = []
+        try:
+            catalogo = AccountCatalog(db_path)
+            catalogo.subscribe(cambios.extend)
+        except Exception as e:
+            error_apertura = e
+
+        try:
+            while True:
+                tarea = self._cola.get()
+                if tarea is None:
+                    break
+                futuro, funcion, args, kwargs = tarea
+                if not futuro.set_running_or_notify_cancel():
+                    continue
+                futuro.cambios = []
+                if error_apertura is not None:
+                    futuro.set_exception(error_apertura)
+                    continue
+                try:
+                    resultado = funcion(catalogo, *args, **kwargs)
+                except Exception as e:
+                    futuro.cambios = cambios[:]
+                    futuro.set_exception(e)
+                else:
+                    futuro.cambios = cambios[:]
+                    futuro.set_result(resultado)
+                cambios.clear()
+        finally:
+            if catalogo is not None:
+                catalogo.close()
+
+_trabajador: Optional[TrabajadorCatalogo] = None
+
+def obtener_trabajador() -> TrabajadorCatalogo:
+    global _trabajador
+    if _trabajador is None:
+        _trabajador = TrabajadorCatalogo(DB_PATH)
+    return _trabajador
+
+def cerrar_catalogo():
+    global _catalogo, _trabajador
+    if _trabajador is not None:
+        _trabajador.cerrar()
+        _trabajador = None
+    if _catalogo is not None:
+        _catalogo.close()
+        _catalogo = None
@@ -0,0 +1,185 @@
+# Representación compacta e inmutable del catálogo de cuentas para abrirlo sin cargar una
+# fila de Python por cuenta. Los códigos, nombres y claves de búsqueda van empaquetados en
+# bloques de bytes con arreglos de desplazamientos; el padre de cada cuenta es el índice de
+# su código (cada código se guarda una sola vez). El archivo se abre con mmap.
+import array
+import bisect
+import mmap
+import os
+import struct
+import threading
+
+MAGIC = b"CATCOMP1"
+# versión (contador de cambios del catálogo), cuentas, padres fuera del catálogo y el largo
+# de los bloques de códigos, nombres, claves y padres fuera del catálogo
+ENCABEZADO = struct.Struct("=7q")
+INICIO_DATOS = len(MAGIC) + ENCABEZADO.size
+SIN_PADRE = -1
+
+class TextosEmpaquetados:
+    # Secuencia de solo lectura sobre un bloque de textos UTF-8 y sus desplazamientos
+    __slots__ = ("datos", "inicio", "offsets")
+
+    def __init__(self, datos, inicio, offsets):
+        self.datos = datos
+        self.inicio = inicio
+        self.offsets = offsets
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        return self.bytes(i).decode("utf-8")
+
+    def bytes(self, i):
+        return self.datos[self.inicio + self.offsets[i]:self.inicio + self.offsets[i + 1]]
+
+def normalizar_busqueda(texto: str) -> str:
+    # Sin mayúsculas y sin saltos de línea, que separan las claves dentro del bloque
+    return texto.casefold().replace("\n", " ")
+
+def clave_busqueda(code: str, name: str) -> str:
+    # Texto "código - nombre" contra el que se filtra al escribir; la usan ambos índices
+    return normalizar_busqueda(f"{code} - {name}")
+
+def rango_coincidencias(codes, prefix: str, text: str):
+    # Rango [inicio, fin) de los descendientes de prefix en la secuencia ordenada codes; si text
+    # es un código se acota a los que empiezan con él. None si ninguno puede coincidir.
+    start = bisect.bisect_right(codes, prefix)
+    end = bisect.bisect_left(codes, prefix + "\uffff", start)
+    if text.isdigit():
+        if text.startswith(prefix):
+            start = max(start, bisect.bisect_left(codes, text, start, end))
+            end = bisect.bisect_left(codes, text + "\uffff", start, end)
+        elif not prefix.startswith(text):
+            return None
+    return start, end
+
+class CatalogoCompacto:
+    def __init__(self, datos):
+        # datos: bytes o mmap con el formato que produce desde_filas
+        if datos[:len(MAGIC)] != MAGIC:
+            raise ValueError("No es un catálogo compacto")
+        self.version, total, extras, largo_codigos, largo_nombres, largo_claves, largo_extras = \
+            ENCABEZADO.unpack_from(datos, len(MAGIC))
+        esperado = (INICIO_DATOS + 4 * (4 * (total + 1) - 1 + extras + 1)
+                    + largo_codigos + largo_nombres + largo_claves + largo_extras)
+        if len(datos) != esperado:
+            raise ValueError("Catálogo compacto incompleto")
+
+        vista = memoryview(datos)
+        posicion = INICIO_DATOS
+
+        def arreglo(cantidad, tipo):
+            nonlocal posicion
+            valores = vista[posicion:posicion + 4 * cantidad].cast(tipo)
+            posicion += 4 * cantidad
+            return valores
+
+        offsets_codigos = arreglo(total + 1, "I")
+        offsets_nombres = arreglo(total + 1, "I")
+        self.offsets_claves = arreglo(total + 1, "I")
+        self.padres = arreglo(total, "i")
+        offsets_extras = arreglo(extras + 1, "I")
+
+        self.datos = datos
+        self.codes = TextosEmpaquetados(datos, posicion, offsets_codigos)
+        posicion += largo_codigos
+        self.names = TextosEmpaquetados(datos, posicion, offsets_nombres)
+        posicion += largo_nombres
+        self.inicio_claves = posicion
+        posicion += largo_claves
+        self.extras = TextosEmpaquetados(datos, posicion, offsets_extras)
+
+    @classmethod
+    def desde_filas(cls, filas, version: int) -> "CatalogoCompacto":
+        # filas: (código, nombre, código padre) ordenadas por código
+        bloques = [bytearray(), bytearray(), bytearray(), bytearray()]
+        offsets = [array.array("I", [0]) for _ in bloques]
+        padres = []
+        posiciones = {}
+        for code, name, parent_code in filas:
+            for bloque, offset, texto in zip(bloques, offsets, (code, name, clave_busqueda(code, name) + "\n")):
+                bloque += texto.encode("utf-8")
+                offset.append(len(bloque))
+            posiciones[code] = len(padres)
+            padres.append(parent_code)
+
+        total = len(padres)
+        posiciones_extras = {}
+        indices_padres = array.array("i")
+        for parent_code in padres:
+            if not parent_code:
+                indices_padres.append(SIN_PADRE)
+            elif parent_code in posiciones:
+                indices_padres.append(posiciones[parent_code])
+            else:
+                # Padre que no está en el catálogo: se guarda aparte, a continuación de los códigos
+                if parent_code not in posiciones_extras:
+                    posiciones_extras[parent_code] = len(posiciones_extras)
+                    bloques[3] += parent_code.encode("utf-8")
+                    offsets[3].append(len(bloques[3]))
+                indices_padres.append(total + posiciones_extras[parent_code])
+
+        encabezado = MAGIC + ENCABEZADO.pack(version, total, len(posiciones_extras),
+                                             *(len(bloque) for bloque in bloques))
+        return cls(b"".join([encabezado, offsets[0].tobytes(), offsets[1].tobytes(), offsets[2].tobytes(),
+                             indices_padres.tobytes(), offsets[3].tobytes(), *bloques]))
+
+    @classmethod
+    def abrir(cls, ruta: str, version: int):
+        # Devuelve None si el archivo no existe, está dañado o corresponde a otra versión
+        try:
+            with open(ruta, "rb") as archivo:
+                datos = mmap.mmap(archivo.fileno(), 0, access=mmap.ACCESS_READ)
+            compacto = cls(datos)
+        except (OSError, ValueError):
+            return None
+        return compacto if compacto.version == version else None
+
+    def escribir(self, ruta: str):
+        # Se escribe aparte y se reemplaza para que un lector nunca vea un archivo a medias
+        temporal = f"{ruta}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temporal, "wb") as archivo:
+            archivo.write(self.datos)
+        os.replace(temporal, ruta)
+
+    def __len__(self):
+        return len(self.codes)
+
+    def __contains__(self, code):
+        posicion = bisect.bisect_left(self.codes, code)
+        return posicion < len(self.codes) and self.codes[posicion] == code
+
+    def fila(self, i):
+        padre = self.padres[i]
+        if padre == SIN_PADRE:
+            parent_code = None
+        elif padre < len(self.codes):
+            parent_code = self.codes[padre]
+        else:
+            parent_code = self.extras[padre - len(self.codes)]
+        return self.codes[i], self.names[i], parent_code
+
+    def matching(self, prefix: str, text: str = ""):
+        # Mismo criterio que AccountPrefixIndex.matching; devuelve tuplas (código, nombre, padre).
+        # Los nombres se buscan directamente en el bloque de claves, sin decodificar filas.
+        text = text.strip()
+        rango = rango_coincidencias(self.codes, prefix, text)
+        if rango is None:
+            return
+        start, end = rango
+        if text and not text.isdigit():
+            aguja = normalizar_busqueda(text).encode("utf-8")
+            offsets = self.offsets_claves
+            inicio = self.inicio_claves
+            fin = inicio + offsets[end]
+            encontrado = self.datos.find(aguja, inicio + offsets[start], fin)
+            while encontrado != -1:
+                i = bisect.bisect_right(offsets, encontrado - inicio, start, end + 1) - 1
+                yield self.fila(i)
+                encontrado = self.datos.find(aguja, inicio + offsets[i + 1], fin)
+            return
+
+        for i in range(start, end):
+            yield self.fila(i)
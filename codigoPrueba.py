@@ -3,9 +3,11 @@ from tkinter import ttk, messagebox
 import sqlite3
 import re
 import locale
+from contextlib import contextmanager
+
+from diagnostico import conectar
+from migraciones import migrar
 
-# Configuración de locale
-locale.setlocale(locale.LC_ALL, 'en_US.UTF-8')
 
 # Funciones de validación
 def validar_solo_letras(cadena):
@@ -15,58 +17,161 @@ def validar_dos_decimales(cadena):
     return re.match(r'^\d+(\.\d{1,2})?$', cadena) is not None
 
 # Funciones de base de datos
+# Una sola conexión reutilizada por toda la aplicación (la interfaz corre en un solo hilo)
+_conexion = None
+# Unidades de trabajo abiertas; mientras haya alguna, ejecutar_db no confirma por su cuenta
+_unidades_abiertas = 0
+
+def obtener_conexion():
+    global _conexion
+    if _conexion is None:
+        _conexion = conectar('contabilidad.db')
+    return _conexion
+
+def cerrar_conexion():
+    global _conexion
+    if _conexion is not None:
+        _conexion.close()
+        _conexion = None
+
+@contextmanager
+def unidad_de_trabajo():
+    # Agrupa varias operaciones en una transacción: se confirma al salir y se deshace si
+    # ocurre un error. Las unidades anidadas forman parte de la más externa.
+    global _unidades_abiertas
+    conn = obtener_conexion()
+    _unidades_abiertas += 1
+    try:
+        yield conn
+    except BaseException:
+        _unidades_abiertas -= 1
+        if _unidades_abiertas == 0:
+            conn.rollback()
+        raise
+    _unidades_abiertas -= 1
+    if _unidades_abiertas == 0:
+        conn.commit()
+
 def ejecutar_db(query, params=(), fetchone=False):
-    with sqlite3.connect('contabilidad.db') as conn:
-        cursor = conn.cursor()
-        cursor.execute(query, params)
+    conn = obtener_conexion()
+    cursor = conn.execute(query, params)
+    resultado = cursor.fetchone() if fetchone else cursor.fetchall()
+    # Las consultas no abren transacción; solo se confirma lo que escribió fuera de una unidad
+    if conn.in_transaction and _unidades_abiertas == 0:
         conn.commit()
-        if fetchone:
-            return cursor.fetchone()
-        return cursor.fetchall()
-
-def crear_tabla():
-    ejecutar_db('''
-    CREATE TABLE IF NOT EXISTS cuentas_balance (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        nombre TEXT NOT NULL,
-        tipo TEXT NOT NULL,
-        monto REAL NOT NULL
-    )
+    return resultado
+
+def _migracion_cuentas_balance(cursor):
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS cuentas_balance (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            nombre TEXT NOT NULL,
+            tipo TEXT NOT NULL,
+            monto REAL NOT NULL
+        )
     ''')
-
-crear_tabla()  # Crear la tabla al iniciar
-
-def cuenta_existe(nombre):
-    return ejecutar_db("SELECT COUNT(*) FROM cuentas_balance WHERE nombre = ?", (nombre,), fetchone=True)[0] > 0
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_cuentas_balance_nombre ON cuentas_balance (nombre)')
+
+# (nombre anterior, nombre nuevo) de las cuentas repetidas que renombró la migración
+cuentas_renombradas = []
+
+def _migracion_nombre_unico(cursor):
+    # El nombre identifica a la cuenta. Los repetidos no se borran: a partir del segundo se
+    # renombran como "NOMBRE (2)", "NOMBRE (3)"... y se avisa al usuario al iniciar
+    nombres = {nombre for (nombre,) in cursor.execute('SELECT nombre FROM cuentas_balance')}
+    repetidas = cursor.execute('''
+        SELECT id, nombre FROM cuentas_balance
+        WHERE id NOT IN (SELECT MIN(id) FROM cuentas_balance GROUP BY nombre)
+        ORDER BY id
+    ''').fetchall()
+    for id_cuenta, nombre in repetidas:
+        copia = 2
+        while f"{nombre} ({copia})" in nombres:
+            copia += 1
+        nuevo_nombre = f"{nombre} ({copia})"
+        nombres.add(nuevo_nombre)
+        cursor.execute('UPDATE cuentas_balance SET nombre = ? WHERE id = ?', (nuevo_nombre, id_cuenta))
+        cuentas_renombradas.append((nombre, nuevo_nombre))
+    cursor.execute('DROP INDEX IF EXISTS idx_cuentas_balance_nombre')
+    cursor.execute('CREATE UNIQUE INDEX IF NOT EXISTS ux_cuentas_balance_nombre ON cuentas_balance (nombre)')
+
+# Migraciones del esquema en orden; PRAGMA user_version guarda cuántas se aplicaron
+MIGRACIONES = [
+    _migracion_cuentas_balance,
+    _migracion_nombre_unico,
+]
+
+def migrar_base_datos():
+    return migrar(obtener_conexion(), MIGRACIONES)
+
+# Funciones que reciben (tipo, nombre, fila) después de cada cambio en cuentas_balance:
+# tipo es "inserted", "updated" o "deleted", nombre la clave anterior y fila los valores nuevos
+oyentes_cuentas = []
+
+def _publicar_cambio(tipo, nombre, fila=None):
+    for oyente in list(oyentes_cuentas):
+        oyente(tipo, nombre, fila)
 
 def guardar_cuenta(nombre, tipo, monto):
-    if cuenta_existe(nombre):
-        messagebox.showerror("Error", "Ya existe una cuenta con ese nombre.")
-        return
+    # El índice único resuelve el duplicado en la misma sentencia que inserta
     try:
-        ejecutar_db("INSERT INTO cuentas_balance (nombre, tipo, monto) VALUES (?, ?, ?)", (nombre, tipo, monto))
-        messagebox.showinfo("Éxito", "Cuenta guardada correctamente.")
+        with unidad_de_trabajo() as conn:
+            insertadas = conn.execute('''
+                INSERT INTO cuentas_balance (nombre, tipo, monto) VALUES (?, ?, ?)
+                ON CONFLICT (nombre) DO NOTHING
+            ''', (nombre, tipo, monto)).rowcount
     except sqlite3.Error as e:
         messagebox.showerror("Error", f"No se pudo guardar la cuenta: {e}")
+        return
+    if not insertadas:
+        messagebox.showerror("Error", "Ya existe una cuenta con ese nombre.")
+        return
+    _publicar_cambio("inserted", nombre, (nombre, tipo, monto))
+    messagebox.showinfo("Éxito", "Cuenta guardada correctamente.")
 
 def obtener_cuentas_balancegeneral():
     return ejecutar_db("SELECT nombre, tipo, monto FROM cuentas_balance")
 
 def buscar_cuenta(nombre):
-    return ejecutar_db("SELECT nombre, tipo, monto FROM cuentas_balance WHERE nombre = ?", (nombre,), fetchone=True)
+    # Coincidencia exacta primero; si no hay, la cuenta que contenga el fragmento, prefiriendo
+    # las que empiezan con él
+    patron = nombre.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return ejecutar_db('''
+        SELECT nombre, tipo, monto FROM cuentas_balance
+        WHERE nombre LIKE ? ESCAPE '\\'
+        ORDER BY nombre = ? DESC, nombre LIKE ? ESCAPE '\\' DESC, length(nombre)
+        LIMIT 1
+    ''', (f"%{patron}%", nombre, f"{patron}%"), fetchone=True)
 
 def editar_cuenta(nombre_original, nuevo_nombre, tipo, monto):
-    if nombre_original != nuevo_nombre and cuenta_existe(nuevo_nombre):
+    # Renombrar a un nombre existente viola el índice único y no modifica nada
+    try:
+        with unidad_de_trabajo() as conn:
+            actualizadas = conn.execute("UPDATE cuentas_balance SET nombre = ?, tipo = ?, monto = ? WHERE nombre = ?",
+                                        (nuevo_nombre, tipo, monto, nombre_original)).rowcount
+    except sqlite3.IntegrityError:
         messagebox.showerror("Error", "Ya existe una cuenta con ese nombre.")
         return False
-    ejecutar_db("UPDATE cuentas_balance SET nombre = ?, tipo = ?, monto = ? WHERE nombre = ?", (nuevo_nombre, tipo, monto, nombre_original))
+    if not actualizadas:
+        return False
+    _publicar_cambio("updated", nombre_original, (nuevo_nombre, tipo, monto))
     return True
 
 def eliminar_cuenta(nombre):
-    ejecutar_db("DELETE FROM cuentas_balance WHERE nombre = ?", (nombre,))
+    with unidad_de_trabajo() as conn:
+        eliminadas = conn.execute("DELETE FROM cuentas_balance WHERE nombre = ?", (nombre,)).rowcount
+    if eliminadas:
+        _publicar_cambio("deleted", nombre)
 
 # Funciones de formateo de números
+_locale_configurado = False
+
 def formatear_numero(numero):
+    # El locale se configura al formatear el primer número y no al importar el módulo
+    global _locale_configurado
+    if not _locale_configurado:
+        locale.setlocale(locale.LC_ALL, 'en_US.UTF-8')
+        _locale_configurado = True
     return locale.format_string('%.2f', numero, grouping=True)
 
 def desformatear_numero(numero_str):
@@ -159,7 +264,20 @@ def crear_cuentas_Estados_Financieros(frame):
         for cuenta in obtener_cuentas_balancegeneral():
             nombre, tipo, monto = cuenta
             monto_formateado = formatear_numero(monto)
-            tabla.insert("", tk.END, values=(nombre, tipo, monto_formateado))
+            tabla.insert("", tk.END, iid=nombre, values=(nombre, tipo, monto_formateado))
+
+    def aplicar_cambio(tipo_cambio, nombre, fila):
+        # Solo se toca la fila afectada (iid = nombre de la cuenta)
+        if tipo_cambio == "inserted":
+            tabla.insert("", tk.END, iid=fila[0], values=(fila[0], fila[1], formatear_numero(fila[2])))
+        elif tabla.exists(nombre):
+            posicion = tabla.index(nombre)
+            tabla.delete(nombre)
+            if tipo_cambio == "updated":
+                tabla.insert("", posicion, iid=fila[0], values=(fila[0], fila[1], formatear_numero(fila[2])))
+
+    oyentes_cuentas.append(aplicar_cambio)
+    tabla.bind("<Destroy>", lambda event: oyentes_cuentas.remove(aplicar_cambio), add="+")
 
     def limpiar_campos():
         widgets['entry_nombre'].delete(0, tk.END)
@@ -190,7 +308,6 @@ def crear_cuentas_Estados_Financieros(frame):
             eliminar_cuenta(nombre)
             messagebox.showinfo("Éxito", "Cuenta eliminada correctamente.")
             limpiar_campos()
-            actualizar_tabla_cuentas()
 
     def editar_cuenta_gui():
         if not validar_campos():
@@ -200,7 +317,6 @@ def crear_cuentas_Estados_Financieros(frame):
         monto = float(widgets['entry_monto'].get().strip())
         if editar_cuenta(nombre_original.get(), nuevo_nombre, tipo, monto):
             messagebox.showinfo("Éxito", "Cuenta actualizada correctamente.")
-            actualizar_tabla_cuentas()
             limpiar_campos()
             nombre_original.set('')
         else:
@@ -213,7 +329,6 @@ def crear_cuentas_Estados_Financieros(frame):
         tipo = widgets['tipo_var'].get()
         monto = float(widgets['entry_monto'].get().strip())
         guardar_cuenta(nombre, tipo, monto)
-        actualizar_tabla_cuentas()
         limpiar_campos()
 
     tk.Button(input_frame, text="Guardar", command=submit_datos, bg="#1E3A8A", fg="white", activebackground="#00587A", width=15, height=1, font=("Arial", 10, "bold")).grid(row=3, column=1, pady=10, sticky="w")
@@ -274,18 +389,27 @@ def mostrar_balance_general(frame):
 
 #Cerrar la aplicación
 def cerrar_aplicacion(ventana):
+    cerrar_conexion()
     ventana.quit()
     ventana.destroy()
     import sys
     sys.exit()
 
 def menu_principal():
+    migrar_base_datos()  # Se aplica una sola vez al iniciar
+
     ventana_principal = tk.Tk()
     ventana_principal.title("Sistema de Contabilidad")
     ventana_principal.geometry("1200x600")
     ventana_principal.configure(bg="#E0F2FE")  # Fondo azul claro
     ventana_principal.resizable(True, True)
 
+    if cuentas_renombradas:
+        detalle = "\n".join(f"{anterior} -> {nuevo}" for anterior, nuevo in cuentas_renombradas[:20])
+        messagebox.showwarning("Cuentas repetidas",
+                               "Había cuentas con el mismo nombre; para que cada nombre sea único se "
+                               f"renombraron {len(cuentas_renombradas)}:\n\n{detalle}")
+
     frame_botones = tk.Frame(ventana_principal, bg="#1E3A8A", width=290, height=400)  # Azul oscuro para menú lateral
     frame_botones.pack(side=tk.LEFT, fill=tk.Y)
     frame_botones.pack_propagate(False)
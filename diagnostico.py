@@ -0,0 +1,157 @@
+# Instrumentación de SQLite: conteo y latencia por sentencia, filas devueltas, conexiones
+# creadas hasta ahora y registro de consultas lentas. Todas las conexiones de la aplicación se abren
+# con conectar() para que pasen por aquí.
+import logging
+import sqlite3
+import threading
+import time
+
+# Límites superiores (ms) de cada intervalo del histograma de latencias; el último es abierto
+LIMITES_HISTOGRAMA = (0.1, 1, 10, 100)
+
+# Umbral y archivo del registro de consultas lentas; se cambian con configurar()
+umbral_lento_ms = 50.0
+_registro_lento = logging.getLogger("consultas_lentas")
+_registro_lento.propagate = False
+_manejador = None
+
+# Reentrante: el recolector de ciclos puede liberar un cursor (y registrar su medición desde
+# __del__) mientras este mismo hilo ya tiene tomado el lock
+_lock = threading.RLock()
+_estadisticas = {}
+_conexiones = 0
+
+def configurar(umbral_ms=None, archivo="consultas_lentas.log"):
+    global umbral_lento_ms, _manejador
+    if umbral_ms is not None:
+        umbral_lento_ms = umbral_ms
+    if _manejador is not None:
+        _registro_lento.removeHandler(_manejador)
+        _manejador.close()
+        _manejador = None
+    if archivo:
+        _manejador = logging.FileHandler(archivo, delay=True, encoding="utf-8")
+        _manejador.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+        _registro_lento.addHandler(_manejador)
+        _registro_lento.setLevel(logging.INFO)
+
+def _registrar(sql, segundos, filas):
+    ms = segundos * 1000
+    clave = " ".join(sql.split())
+    intervalo = next((i for i, limite in enumerate(LIMITES_HISTOGRAMA) if ms < limite), len(LIMITES_HISTOGRAMA))
+    with _lock:
+        estadistica = _estadisticas.get(clave)
+        if estadistica is None:
+            estadistica = _estadisticas[clave] = {
+                "ejecuciones": 0,
+                "tiempo_total_ms": 0.0,
+                "tiempo_max_ms": 0.0,
+                "filas": 0,
+                "histograma": [0] * (len(LIMITES_HISTOGRAMA) + 1),
+            }
+        estadistica["ejecuciones"] += 1
+        estadistica["tiempo_total_ms"] += ms
+        estadistica["tiempo_max_ms"] = max(estadistica["tiempo_max_ms"], ms)
+        estadistica["filas"] += filas
+        estadistica["histograma"][intervalo] += 1
+    if ms >= umbral_lento_ms:
+        _registro_lento.info("%.2f ms, %d filas: %s", ms, filas, clave)
+
+def instantanea():
+    # Copia de los contadores para mostrarlos sin retener el lock
+    with _lock:
+        return _conexiones, {clave: dict(valor, histograma=list(valor["histograma"]))
+                                      for clave, valor in _estadisticas.items()}
+
+def reiniciar():
+    with _lock:
+        _estadisticas.clear()
+
+class CursorInstrumentado(sqlite3.Cursor):
+    # Cada ejecución se mide junto con las lecturas de sus resultados y se registra al
+    # ejecutar la siguiente sentencia con el mismo cursor o al liberarlo
+    _sql = None
+    _segundos = 0.0
+    _filas = 0
+
+    def _cerrar_medicion(self):
+        if self._sql is not None:
+            _registrar(self._sql, self._segundos, self._filas)
+            self._sql = None
+
+    def _medir(self, sql, funcion, *args):
+        self._cerrar_medicion()
+        inicio = time.perf_counter()
+        try:
+            return funcion(*args)
+        finally:
+            self._sql = sql
+            self._segundos = time.perf_counter() - inicio
+            self._filas = 0
+
+    def execute(self, sql, parameters=()):
+        return self._medir(sql, super().execute, sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self._medir(sql, super().executemany, sql, seq_of_parameters)
+
+    def executescript(self, sql_script):
+        return self._medir(sql_script, super().executescript, sql_script)
+
+    def _leer(self, funcion, *args):
+        inicio = time.perf_counter()
+        resultado = funcion(*args)
+        self._segundos += time.perf_counter() - inicio
+        return resultado
+
+    def fetchone(self):
+        fila = self._leer(super().fetchone)
+        if fila is not None:
+            self._filas += 1
+        return fila
+
+    def fetchmany(self, size=None):
+        filas = self._leer(super().fetchmany, self.arraysize if size is None else size)
+        self._filas += len(filas)
+        return filas
+
+    def fetchall(self):
+        filas = self._leer(super().fetchall)
+        self._filas += len(filas)
+        return filas
+
+    def __next__(self):
+        fila = self._leer(super().__next__)
+        self._filas += 1
+        return fila
+
+    def close(self):
+        self._cerrar_medicion()
+        super().close()
+
+    def __del__(self):
+        self._cerrar_medicion()
+
+class ConexionInstrumentada(sqlite3.Connection):
+    def __init__(self, *args, **kwargs):
+        global _conexiones
+        super().__init__(*args, **kwargs)
+        with _lock:
+            _conexiones += 1
+
+    def cursor(self, factory=CursorInstrumentado):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def executescript(self, sql_script):
+        return self.cursor().executescript(sql_script)
+
+def conectar(database, **kwargs):
+    return sqlite3.connect(database, factory=ConexionInstrumentada, **kwargs)
+
+configurar()
@@ -1,6 +1,6 @@
+import os
 import tkinter as tk
 from tkinter import messagebox
-from PIL import Image, ImageTk
 
 def iniciar_sesion(event=None): 
     usuario = entry_usuario.get()
@@ -25,9 +25,41 @@ ventana_login.title("Login")
 ventana_login.geometry("400x600")  
 ventana_login.configure(bg="#F0F4F8")  
 
-imagen = Image.open("calculo.png") 
-imagen = imagen.resize((120, 120), Image.LANCZOS)  
-imagen_tk = ImageTk.PhotoImage(imagen)
+CARPETA_CACHE = "cache_imagenes"
+
+def cargar_imagen(ruta="calculo.png", lado=120):
+    # La imagen escalada se guarda como PNG, que Tk lee sin ayuda; el nombre lleva la fecha
+    # de modificación y el tamaño del original para notar cuando este cambia
+    estado = os.stat(ruta)
+    base = os.path.splitext(os.path.basename(ruta))[0]
+    prefijo = f"{base}_{lado}x{lado}_"
+    ruta_cache = os.path.join(CARPETA_CACHE, f"{prefijo}{estado.st_mtime_ns}_{estado.st_size}.png")
+
+    if os.path.exists(ruta_cache):
+        try:
+            return tk.PhotoImage(file=ruta_cache)
+        except tk.TclError:
+            pass  # Copia dañada: se vuelve a generar
+
+    # PIL solo se importa cuando hay que escalar la imagen
+    from PIL import Image, ImageTk
+    imagen = Image.open(ruta)
+    imagen = imagen.resize((lado, lado), Image.LANCZOS)
+
+    try:
+        os.makedirs(CARPETA_CACHE, exist_ok=True)
+        for anterior in os.listdir(CARPETA_CACHE):
+            if anterior.startswith(prefijo):
+                os.remove(os.path.join(CARPETA_CACHE, anterior))
+        temporal = ruta_cache + ".tmp"
+        imagen.save(temporal, "PNG")
+        os.replace(temporal, ruta_cache)
+    except OSError:
+        pass  # Sin caché se sigue funcionando, solo que más lento
+
+    return ImageTk.PhotoImage(imagen)
+
+imagen_tk = cargar_imagen()
 
 
 frame_contenido = tk.Frame(ventana_login, bg="#FFFFFF", bd=2, relief="flat", padx=20, pady=20)
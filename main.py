@@ -1,4 +1,127 @@
-from menu import menu_principal
+import argparse
+import sys
+
+# Sin argumentos se abre la aplicación de escritorio; con un subcomando se trabaja sin
+# pantalla. Los módulos se importan dentro de cada comando para no cargar tkinter ni
+# ReportLab cuando no hacen falta.
+
+def catalog_import(args):
+    from catalogo import AccountCatalog
+
+    db = AccountCatalog(args.db)
+    try:
+        resultado = db.import_accounts(args.archivo)
+    finally:
+        db.close()
+    for numero, code, motivo in resultado.errors:
+        print(f"Fila {numero} ({code}): {motivo}", file=sys.stderr)
+    if resultado.read_error:
+        print(f"La lectura del archivo se detuvo por un error: {resultado.read_error}", file=sys.stderr)
+    print(f"{resultado.imported} cuentas importadas, {len(resultado.errors)} rechazadas")
+    return 1 if resultado.errors or resultado.read_error else 0
+
+def catalog_export(args):
+    import csv
+    from catalogo import AccountCatalog
+
+    db = AccountCatalog(args.db)
+    salida = open(args.archivo, "w", newline="", encoding="utf-8") if args.archivo else sys.stdout
+    try:
+        writer = csv.writer(salida)
+        writer.writerow(["codigo", "nombre", "padre"])
+        for account in db.iter_accounts(args.prefijo):
+            writer.writerow([account.code, account.name, account.parent_code or ""])
+    finally:
+        if salida is not sys.stdout:
+            salida.close()
+        db.close()
+    return 0
+
+def balance_totals(args):
+    from catalogo import AccountCatalog
+    from balance import SECCIONES_BALANCE, cargar_balance_general, listar_balances_generales, totales_balance_general
+
+    db = AccountCatalog(args.db)
+    try:
+        if args.id is None:
+            for balance_id, fecha, empresa, activos, pasivos, patrimonio in listar_balances_generales(db.conn):
+                estado = "cuadra" if abs(activos - (pasivos + patrimonio)) <= 0.01 else "NO cuadra"
+                print(f"{balance_id:>5}  {fecha}  {empresa:<30}  activos {activos:>15,.2f}  "
+                      f"pasivos {pasivos:>15,.2f}  patrimonio {patrimonio:>15,.2f}  {estado}")
+            return 0
+
+        guardado = cargar_balance_general(db.conn, args.id)
+        if guardado is None:
+            print(f"El balance {args.id} no existe", file=sys.stderr)
+            return 1
+        fecha, empresa, lineas = guardado
+        if not lineas:
+            # Guardado antes de registrar las líneas: solo hay totales del encabezado
+            activos, pasivos, patrimonio = totales_balance_general(db.conn, args.id)
+            print(f"{empresa} al {fecha} (sin detalle por sección)")
+            for titulo, monto in (("ACTIVOS", activos), ("PASIVOS", pasivos), ("PATRIMONIO", patrimonio)):
+                print(f"  {titulo:<24} {monto:>15,.2f}")
+            return 0
+        totales = {seccion: 0 for seccion in SECCIONES_BALANCE.values()}
+        for seccion, _, _, monto in lineas:
+            totales[seccion] += round(monto * 100)
+        print(f"{empresa} al {fecha}")
+        for titulo, seccion in SECCIONES_BALANCE.items():
+            print(f"  {titulo:<24} {totales[seccion] / 100:>15,.2f}")
+        return 0
+    finally:
+        db.close()
+
+def balance_pdf(args):
+    from reportes import renderizar_balances_guardados
+
+    resultados = renderizar_balances_guardados(args.salida, args.db, args.procesos)
+    errores = [(balance_id, error) for balance_id, _, error in resultados if error]
+    for balance_id, error in errores:
+        print(f"Balance {balance_id}: {error}", file=sys.stderr)
+    print(f"{len(resultados) - len(errores)} PDF generados en {args.salida}")
+    return 1 if errores else 0
+
+def crear_parser():
+    from catalogo import DB_PATH
+
+    parser = argparse.ArgumentParser(description="Sistema de Contabilidad")
+    parser.add_argument("--db", default=DB_PATH, help="Base de datos del catálogo y los balances")
+    parser.add_argument("--umbral-lento", type=float, default=None, metavar="MS",
+                        help="Milisegundos a partir de los cuales una consulta va a consultas_lentas.log")
+    grupos = parser.add_subparsers(dest="grupo")
+
+    catalog = grupos.add_parser("catalog", help="Catálogo de cuentas").add_subparsers(dest="comando", required=True)
+    importar = catalog.add_parser("import", help="Importa cuentas desde un CSV o XLSX")
+    importar.add_argument("archivo")
+    importar.set_defaults(funcion=catalog_import)
+    exportar = catalog.add_parser("export", help="Exporta el catálogo como CSV")
+    exportar.add_argument("archivo", nargs="?", help="Archivo de salida (por defecto, la salida estándar)")
+    exportar.add_argument("--prefijo", help="Exporta solo la cuenta con este código y sus subcuentas")
+    exportar.set_defaults(funcion=catalog_export)
+
+    balance = grupos.add_parser("balance", help="Balances generales guardados").add_subparsers(dest="comando", required=True)
+    totales = balance.add_parser("totals", help="Muestra los totales de los balances guardados")
+    totales.add_argument("--id", type=int, help="Detalle por sección de un solo balance")
+    totales.set_defaults(funcion=balance_totals)
+    pdf = balance.add_parser("pdf", help="Genera el PDF de todos los balances guardados")
+    pdf.add_argument("--salida", required=True, help="Carpeta donde se escriben los PDF")
+    pdf.add_argument("--procesos", type=int, default=None, help="Procesos de trabajo (por defecto, uno por núcleo)")
+    pdf.set_defaults(funcion=balance_pdf)
+    return parser
+
+def main(argv=None):
+    args = crear_parser().parse_args(argv)
+    if args.umbral_lento is not None:
+        import diagnostico
+        diagnostico.umbral_lento_ms = args.umbral_lento
+    if args.grupo is None:
+        import catalogo
+        from menu import menu_principal
+        catalogo.DB_PATH = args.db
+        menu_principal()
+        return 0
+    return args.funcion(args)
 
 if __name__ == "__main__":
-    menu_principal()
+    sys.exit(main())
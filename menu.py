@@ -1,139 +1,175 @@
+import bisect
 import re
 import tkinter as tk
 from tkinter import ttk, messagebox
-import sqlite3
-from dataclasses import dataclass
-from typing import Optional
 import os
+import queue
+import threading
 from tkinter import filedialog
 
-from reportlab.lib import colors
-from reportlab.lib.pagesizes import letter
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.units import inch
+import diagnostico
+from catalogo import AccountCatalog, obtener_catalogo, obtener_trabajador, cerrar_catalogo
+from balance import (SECCIONES_ACTIVO, SECCIONES_PASIVO, BalanceSheet,
+                     guardar_balance_general, cargar_balance_general, listar_balances_generales)
 
 # Funcion para validar que la cadena tenga solo letras
 def validar_solo_letras(cadena):
     return all(caracter.isalpha() or caracter.isspace() for caracter in cadena)
 
-#Funcion para validar que la cadena tenga dos decimales
-def validar_dos_decimales(cadena):
-    return re.match(r'^\d+(\.\d{1,2})?$', cadena) is not None
-
-@dataclass
-class Account:
-    code: str
-    name: str
-    parent_code: Optional[str]
-
-class AccountCatalog:
-    def __init__(self, db_path: str):
-        self.conn = sqlite3.connect(db_path)
-        self.create_table()
-        self.initialize_main_accounts()
-
-    def create_table(self):
-        cursor = self.conn.cursor()
-        cursor.execute('''
-        CREATE TABLE IF NOT EXISTS accounts (
-            code TEXT PRIMARY KEY,
-            name TEXT NOT NULL,
-            parent_code TEXT,
-            FOREIGN KEY (parent_code) REFERENCES accounts (code)
-        )
-        ''')
-        self.conn.commit()
-
-    def initialize_main_accounts(self):
-        main_accounts = [
-            ("1", "ACTIVO", None),
-            ("2", "PASIVO", None),
-            ("3", "PATRIMONIO", None),
-            ("4", "CUENTAS DE RESULTADO DEUDORAS", None),
-            ("5", "CUENTAS DE RESULTADO ACREEDORAS", None),
-            ("6", "CUENTA DE PUENTE DE CIERRE", None)
-        ]
-
-        cursor = self.conn.cursor()
-        for code, name, parent in main_accounts:
-            cursor.execute('''
-            INSERT OR IGNORE INTO accounts (code, name, parent_code)
-            VALUES (?, ?, ?)
-            ''', (code, name, parent))
-        self.conn.commit()
-
-    def validate_account_code(self, code: str, parent_code: str) -> bool:
-        if not code.isdigit():
-            return False
-
-        if parent_code and not code.startswith(parent_code):
-            return False
-
-        if len(code) not in [1, 2, 4, 6, 8]:
-            return False
-
-        return True
-
-    def create_account(self, code: str, name: str, parent_code: str) -> bool:
-        try:
-            if not self.validate_account_code(code, parent_code):
-                return False
-
-            cursor = self.conn.cursor()
-            cursor.execute('''
-            INSERT INTO accounts (code, name, parent_code)
-            VALUES (?, ?, ?)
-            ''', (code, name, parent_code if parent_code else None))
-
-            self.conn.commit()
-            return True
-
-        except Exception as e:
-            print(f"Error al crear la cuenta: {e}")
-            return False
-
-    def buscar_cuenta_por_codigo(self, code: str) -> Optional[Account]:
-        cursor = self.conn.cursor()
-        cursor.execute('SELECT code, name, parent_code FROM accounts WHERE code = ?', (code,))
-        row = cursor.fetchone()
-        if row:
-            return Account(code=row[0], name=row[1], parent_code=row[2])
-        return None
-
-    def editar_cuenta(self, codigo_original: str, nuevo_codigo: str, nuevo_nombre: str, nuevo_padre: str) -> bool:
-        try:
-            if nuevo_padre and not self.validate_account_code(nuevo_codigo, nuevo_padre):
-                return False
-
-            cursor = self.conn.cursor()
-            cursor.execute('''
-            UPDATE accounts
-            SET code = ?, name = ?, parent_code = ?
-            WHERE code = ?
-            ''', (nuevo_codigo, nuevo_nombre, nuevo_padre if nuevo_padre else None, codigo_original))
-
-            self.conn.commit()
-            return cursor.rowcount > 0
-
-        except Exception as e:
-            print(f"Error al editar la cuenta: {e}")
-            return False
-
-    def eliminar_cuenta(self, code: str) -> bool:
-        try:
-            cursor = self.conn.cursor()
-            cursor.execute('DELETE FROM accounts WHERE code = ?', (code,))
-            self.conn.commit()
-            return cursor.rowcount > 0
-        except Exception as e:
-            print(f"Error al eliminar la cuenta: {e}")
-            return False
-
-    def get_all_accounts(self):
-        cursor = self.conn.cursor()
-        cursor.execute('SELECT code, name, parent_code FROM accounts ORDER BY code')
-        return [Account(code, name, parent_code) for code, name, parent_code in cursor.fetchall()]
+def en_segundo_plano(widget, funcion, *args, exito=None, error=None):
+    # Ejecuta funcion(catalogo, *args) en el hilo de la base de datos y entrega el resultado
+    # al hilo de Tk con after(). Los cambios al catálogo se aplican siempre al catálogo
+    # compartido (y a sus vistas); si el widget ya no existe, el resultado se descarta.
+    futuro = obtener_trabajador().enviar(funcion, *args)
+    raiz = widget.winfo_toplevel()
+
+    def revisar():
+        if not futuro.done():
+            raiz.after(20, revisar)
+            return
+        if futuro.cambios:
+            obtener_catalogo().apply_changes(futuro.cambios)
+        if not widget.winfo_exists():
+            return
+        excepcion = futuro.exception()
+        if excepcion is None:
+            if exito is not None:
+                exito(futuro.result())
+        elif error is not None:
+            error(excepcion)
+        else:
+            messagebox.showerror("Error", str(excepcion))
+
+    raiz.after(20, revisar)
+    return futuro
+
+class TablaCuentasPaginada:
+    # Carga el catálogo en un Treeview por páginas a medida que el usuario se acerca al final
+    def __init__(self, tabla, scrollbar, db, page_size: int = 200):
+        self.tabla = tabla
+        self.scrollbar = scrollbar
+        self.db = db
+        self.page_size = page_size
+        self.ultimo_codigo = None
+        self.completo = False
+        self._pendiente = False
+        # Códigos cargados, en el mismo orden que las filas de la tabla
+        self.codigos = []
+        tabla.configure(yscrollcommand=self._on_scroll)
+        db.subscribe(self.aplicar_cambios)
+        tabla.bind("<Destroy>", lambda event: db.unsubscribe(self.aplicar_cambios), add="+")
+
+    def _on_scroll(self, first, last):
+        self.scrollbar.set(first, last)
+        # Al acercarse al final de lo cargado se pide la siguiente página
+        if not self.completo and not self._pendiente and float(last) > 0.9:
+            self._pendiente = True
+            self.tabla.after_idle(self.cargar_pagina)
+
+    def cargar_pagina(self):
+        self._pendiente = False
+        if self.completo or not self.tabla.winfo_exists():
+            return
+        cuentas = self.db.get_accounts_page(self.ultimo_codigo, self.page_size)
+        for account in cuentas:
+            self.tabla.insert("", tk.END, iid=account.code, values=self._valores(account))
+        self.codigos.extend(account.code for account in cuentas)
+        if cuentas:
+            self.ultimo_codigo = cuentas[-1].code
+        if len(cuentas) < self.page_size:
+            self.completo = True
+
+    def recargar(self):
+        self.tabla.delete(*self.tabla.get_children())
+        self.codigos.clear()
+        self.ultimo_codigo = None
+        self.completo = False
+        self.cargar_pagina()
+
+    @staticmethod
+    def _valores(account):
+        return account.code, account.name, account.parent_code if account.parent_code else ""
+
+    def aplicar_cambios(self, cambios):
+        # Solo se tocan las filas afectadas; las cuentas más allá de lo cargado llegarán
+        # con las páginas siguientes
+        for cambio in cambios:
+            if cambio.kind == "reset":
+                self.recargar()
+                return
+            if cambio.kind == "updated" and cambio.code == cambio.account.code and self.tabla.exists(cambio.code):
+                self.tabla.item(cambio.code, values=self._valores(cambio.account))
+                continue
+            if cambio.kind in ("updated", "deleted") and self.tabla.exists(cambio.code):
+                del self.codigos[bisect.bisect_left(self.codigos, cambio.code)]
+                self.tabla.delete(cambio.code)
+            if cambio.kind in ("inserted", "updated"):
+                code = cambio.account.code
+                if self.completo or (self.ultimo_codigo is not None and code < self.ultimo_codigo):
+                    posicion = bisect.bisect_left(self.codigos, code)
+                    self.codigos.insert(posicion, code)
+                    self.tabla.insert("", posicion, iid=code, values=self._valores(cambio.account))
+
+class ArbolCuentasPerezoso:
+    # Muestra el catálogo como árbol; los hijos de cada nodo se consultan al expandirlo
+    def __init__(self, arbol, db):
+        self.arbol = arbol
+        self.db = db
+        self.cargados = set()
+        arbol.bind("<<TreeviewOpen>>", self._on_open)
+        db.subscribe(self.aplicar_cambios)
+        arbol.bind("<Destroy>", lambda event: db.unsubscribe(self.aplicar_cambios), add="+")
+
+    def cargar_raices(self):
+        self._insertar_hijos("", self.db.get_children(None))
+
+    def _insertar_hijos(self, nodo, cuentas):
+        conteos = self.db.count_children([cuenta.code for cuenta in cuentas])
+        for cuenta in cuentas:
+            self.arbol.insert(nodo, tk.END, iid=cuenta.code, text=cuenta.code, values=(cuenta.name,))
+            # Hijo temporal para que el nodo muestre la flecha de expansión
+            if conteos[cuenta.code]:
+                self.arbol.insert(cuenta.code, tk.END, iid=f"{cuenta.code}#", text="Cargando...")
+
+    def _on_open(self, event):
+        nodo = self.arbol.focus()
+        if not nodo or nodo in self.cargados:
+            return
+        self.cargados.add(nodo)
+        self.arbol.delete(*self.arbol.get_children(nodo))
+        self._insertar_hijos(nodo, self.db.get_children(nodo))
+
+    def aplicar_cambios(self, cambios):
+        for cambio in cambios:
+            if cambio.kind == "reset":
+                self.arbol.delete(*self.arbol.get_children())
+                self.cargados.clear()
+                self.cargar_raices()
+                return
+            if cambio.kind == "updated" and self.arbol.exists(cambio.code) and cambio.code == cambio.account.code \
+                    and self.arbol.parent(cambio.code) == (cambio.account.parent_code or ""):
+                # Mismo lugar en el árbol: se conserva el nodo y lo que tenga expandido
+                self.arbol.item(cambio.code, values=(cambio.account.name,))
+                continue
+            if cambio.kind in ("updated", "deleted") and self.arbol.exists(cambio.code):
+                self.arbol.delete(cambio.code)
+                self.cargados.discard(cambio.code)
+            if cambio.kind in ("inserted", "updated"):
+                self._insertar_cuenta(cambio.account)
+
+    def _insertar_cuenta(self, cuenta):
+        padre = cuenta.parent_code or ""
+        if padre and not self.arbol.exists(padre):
+            return  # Rama todavía no visible; se consultará al expandirla
+        if padre and padre not in self.cargados:
+            # Padre sin expandir: basta con que muestre la flecha
+            if not self.arbol.get_children(padre):
+                self.arbol.insert(padre, tk.END, iid=f"{padre}#", text="Cargando...")
+            return
+        posicion = bisect.bisect_left(self.arbol.get_children(padre), cuenta.code)
+        self.arbol.insert(padre, posicion, iid=cuenta.code, text=cuenta.code, values=(cuenta.name,))
+        if self.db.count_children([cuenta.code])[cuenta.code]:
+            self.arbol.insert(cuenta.code, tk.END, iid=f"{cuenta.code}#", text="Cargando...")
 
 def ver_catalogo_cuentas(frame):
     for widget in frame.winfo_children():
@@ -151,49 +187,67 @@ def ver_catalogo_cuentas(frame):
                      bg="#E0F2FE",
                      font=("Arial", 16, "bold"),
                      fg="#1E3A8A")
-    titulo.pack(pady=(0, 20))
+    titulo.pack(pady=(0, 10))
+
+    # Selector del modo de vista
+    modo_frame = tk.Frame(main_frame, bg="#E0F2FE")
+    modo_frame.pack(fill=tk.X, pady=(0, 10))
+    modo = tk.StringVar(value="lista")
 
     # Frame para la tabla
     table_frame = tk.Frame(main_frame, bg="#E0F2FE", relief="raised", borderwidth=1)
     table_frame.pack(fill=tk.BOTH, expand=True)
 
-    # Crear tabla
-    tabla = ttk.Treeview(table_frame,
-                        columns=("Código", "Nombre", "Código Padre"),
-                        show='headings',
-                        height=20)
-
-    # Configurar columnas
-    tabla.heading("Código", text="Código")
-    tabla.heading("Nombre", text="Nombre")
-    tabla.heading("Código Padre", text="Código Padre")
-
-    tabla.column("Código", width=150)
-    tabla.column("Nombre", width=400)
-    tabla.column("Código Padre", width=150)
+    db = obtener_catalogo()
 
-    # Agregar scrollbar
-    scrollbar = ttk.Scrollbar(table_frame, orient=tk.VERTICAL, command=tabla.yview)
-    tabla.configure(yscrollcommand=scrollbar.set)
+    def mostrar_vista():
+        for widget in table_frame.winfo_children():
+            widget.destroy()
 
-    # Empaquetar tabla y scrollbar
-    tabla.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
-    scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        if modo.get() == "arbol":
+            # Árbol jerárquico: solo se cargan las cuentas raíz
+            tabla = ttk.Treeview(table_frame, columns=("Nombre",), show='tree headings', height=20)
+            tabla.heading("#0", text="Código")
+            tabla.heading("Nombre", text="Nombre")
+            tabla.column("#0", width=250)
+            tabla.column("Nombre", width=450)
+        else:
+            tabla = ttk.Treeview(table_frame,
+                                columns=("Código", "Nombre", "Código Padre"),
+                                show='headings',
+                                height=20)
+
+            # Configurar columnas
+            tabla.heading("Código", text="Código")
+            tabla.heading("Nombre", text="Nombre")
+            tabla.heading("Código Padre", text="Código Padre")
+
+            tabla.column("Código", width=150)
+            tabla.column("Nombre", width=400)
+            tabla.column("Código Padre", width=150)
+
+        # Agregar scrollbar
+        scrollbar = ttk.Scrollbar(table_frame, orient=tk.VERTICAL, command=tabla.yview)
+
+        # Empaquetar tabla y scrollbar
+        tabla.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+
+        if modo.get() == "arbol":
+            tabla.configure(yscrollcommand=scrollbar.set)
+            ArbolCuentasPerezoso(tabla, db).cargar_raices()
+        else:
+            # Cargar datos por páginas
+            TablaCuentasPaginada(tabla, scrollbar, db).cargar_pagina()
 
-    # Cargar datos
-    db = AccountCatalog("catalogo_cuentas.db")
-    accounts = db.get_all_accounts()
+    for texto, valor in [("Lista", "lista"), ("Árbol", "arbol")]:
+        tk.Radiobutton(modo_frame, text=texto, variable=modo, value=valor, command=mostrar_vista,
+                       bg="#E0F2FE", font=("Arial", 10, "bold"), fg="#1E3A8A").pack(side=tk.LEFT, padx=5)
 
-    # Insertar datos en la tabla
-    for account in accounts:
-        tabla.insert("", tk.END, values=(
-            account.code,
-            account.name,
-            account.parent_code if account.parent_code else ""
-        ))
+    mostrar_vista()
 
     # Agregar contador de cuentas
-    total_cuentas = len(accounts)
+    total_cuentas = db.count_accounts()
     contador = tk.Label(main_frame,
                        text=f"Total de cuentas: {total_cuentas}",
                        bg="#E0F2FE",
@@ -201,6 +255,18 @@ def ver_catalogo_cuentas(frame):
                        fg="#1E3A8A")
     contador.pack(pady=10)
 
+    def actualizar_contador(cambios):
+        nonlocal total_cuentas
+        if any(cambio.kind == "reset" for cambio in cambios):
+            total_cuentas = db.count_accounts()
+        else:
+            total_cuentas += sum(cambio.kind == "inserted" for cambio in cambios)
+            total_cuentas -= sum(cambio.kind == "deleted" for cambio in cambios)
+        contador.config(text=f"Total de cuentas: {total_cuentas}")
+
+    db.subscribe(actualizar_contador)
+    contador.bind("<Destroy>", lambda event: db.unsubscribe(actualizar_contador), add="+")
+
 def crear_cuentas_Estados_Financieros(frame):
     for widget in frame.winfo_children():
         widget.destroy()
@@ -242,38 +308,35 @@ def crear_cuentas_Estados_Financieros(frame):
 
     # Agregar scrollbar
     scrollbar = ttk.Scrollbar(table_frame, orient=tk.VERTICAL, command=tabla.yview)
-    tabla.configure(yscrollcommand=scrollbar.set)
     scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
 
     # Frame para la búsqueda y botones (parte inferior)
     search_frame = tk.Frame(main_frame, bg="#E0F2FE", relief="raised", borderwidth=1)
     search_frame.pack(fill=tk.X)
 
-    tk.Label(search_frame, text="Ingrese código a buscar:", bg="#E0F2FE", font=("Arial", 10, "bold"), fg="#1E3A8A").pack(side=tk.LEFT, padx=(10, 5), pady=10)
+    tk.Label(search_frame, text="Ingrese código o nombre a buscar:", bg="#E0F2FE", font=("Arial", 10, "bold"), fg="#1E3A8A").pack(side=tk.LEFT, padx=(10, 5), pady=10)
     entry_buscarCuenta = tk.Entry(search_frame, width=30, bg="#F3F4F6")
     entry_buscarCuenta.pack(side=tk.LEFT, padx=5, pady=10)
 
+    # Coincidencias mientras se escribe; solo se muestra cuando hay resultados
+    lista_coincidencias = tk.Listbox(main_frame, height=8, bg="#F3F4F6", font=("Arial", 10))
+    coincidencias = []
+
     # Variable para almacenar el código original durante la edición
     codigo_original = tk.StringVar()
 
-    # Inicializar la base de datos
-    db = AccountCatalog("catalogo_cuentas.db")
+    # Catálogo compartido
+    db = obtener_catalogo()
+    tabla_paginada = TablaCuentasPaginada(tabla, scrollbar, db)
 
     def actualizar_tabla():
-        for item in tabla.get_children():
-            tabla.delete(item)
-        accounts = db.get_all_accounts()
-        for account in accounts:
-            tabla.insert("", tk.END, values=(
-                account.code,
-                account.name,
-                account.parent_code if account.parent_code else ""
-            ))
+        tabla_paginada.recargar()
 
     def limpiar_campos():
         for widget in widgets.values():
             widget.delete(0, tk.END)
         entry_buscarCuenta.delete(0, tk.END)
+        lista_coincidencias.pack_forget()
         codigo_original.set('')
 
     def agregar_cuenta():
@@ -289,12 +352,58 @@ def crear_cuentas_Estados_Financieros(frame):
             messagebox.showerror("Error", "El nombre solo puede contener letras y espacios.")
             return
 
-        if db.create_account(codigo, nombre, padre):
-            actualizar_tabla()
-            limpiar_campos()
-            messagebox.showinfo("Éxito", "Cuenta agregada correctamente")
-        else:
-            messagebox.showerror("Error", "No se pudo crear la cuenta. Verifique el formato del código y que el código padre exista.")
+        def terminar(creada):
+            if creada:
+                limpiar_campos()
+                messagebox.showinfo("Éxito", "Cuenta agregada correctamente")
+            else:
+                messagebox.showerror("Error", "No se pudo crear la cuenta. Verifique el formato del código y que el código padre exista.")
+
+        en_segundo_plano(main_frame, AccountCatalog.create_account, codigo, nombre, padre, exito=terminar)
+
+    # Identificador del after() pendiente para buscar solo tras una pausa al escribir
+    busqueda_pendiente = None
+    # Número de la última búsqueda enviada; las respuestas de búsquedas anteriores se descartan
+    ultima_busqueda = 0
+
+    def mostrar_coincidencias():
+        nonlocal busqueda_pendiente, ultima_busqueda
+        busqueda_pendiente = None
+        ultima_busqueda += 1
+        numero = ultima_busqueda
+
+        def mostrar(encontradas):
+            if numero != ultima_busqueda:
+                return
+            coincidencias[:] = encontradas
+            lista_coincidencias.delete(0, tk.END)
+            for cuenta in coincidencias:
+                lista_coincidencias.insert(tk.END, f"{cuenta.code} - {cuenta.name}")
+            if coincidencias:
+                lista_coincidencias.pack(fill=tk.X, pady=(5, 0))
+            else:
+                lista_coincidencias.pack_forget()
+
+        en_segundo_plano(main_frame, AccountCatalog.search_accounts, entry_buscarCuenta.get(), 20, exito=mostrar)
+
+    def programar_busqueda(event=None):
+        nonlocal busqueda_pendiente
+        if busqueda_pendiente is not None:
+            main_frame.after_cancel(busqueda_pendiente)
+        busqueda_pendiente = main_frame.after(150, mostrar_coincidencias)
+
+    def elegir_coincidencia(event=None):
+        seleccion = lista_coincidencias.curselection()
+        if not seleccion:
+            return
+        entry_buscarCuenta.delete(0, tk.END)
+        entry_buscarCuenta.insert(0, coincidencias[seleccion[0]].code)
+        lista_coincidencias.pack_forget()
+        buscar_cuenta()
+
+    entry_buscarCuenta.bind("<KeyRelease>", programar_busqueda)
+    lista_coincidencias.bind("<Double-Button-1>", elegir_coincidencia)
+    lista_coincidencias.bind("<Return>", elegir_coincidencia)
 
     def buscar_cuenta():
         codigo = entry_buscarCuenta.get().strip()
@@ -302,19 +411,29 @@ def crear_cuentas_Estados_Financieros(frame):
             messagebox.showerror("Error", "Ingrese un código para buscar.")
             return
 
-        cuenta = db.buscar_cuenta_por_codigo(codigo)
-        if cuenta:
-            widgets['entry_codigo'].delete(0, tk.END)
-            widgets['entry_codigo'].insert(0, cuenta.code)
-            widgets['entry_nombre'].delete(0, tk.END)
-            widgets['entry_nombre'].insert(0, cuenta.name)
-            widgets['entry_padre'].delete(0, tk.END)
-            if cuenta.parent_code:
-                widgets['entry_padre'].insert(0, cuenta.parent_code)
-            codigo_original.set(cuenta.code)
-            messagebox.showinfo("Éxito", "Cuenta encontrada.")
-        else:
-            messagebox.showerror("Error", "La cuenta no existe.")
+        def buscar(catalogo, texto):
+            # Si se escribió parte del nombre se toma la mejor coincidencia
+            if not texto.isdigit():
+                encontradas = catalogo.search_accounts(texto, 1)
+                if encontradas:
+                    texto = encontradas[0].code
+            return catalogo.buscar_cuenta_por_codigo(texto)
+
+        def mostrar(cuenta):
+            if cuenta:
+                widgets['entry_codigo'].delete(0, tk.END)
+                widgets['entry_codigo'].insert(0, cuenta.code)
+                widgets['entry_nombre'].delete(0, tk.END)
+                widgets['entry_nombre'].insert(0, cuenta.name)
+                widgets['entry_padre'].delete(0, tk.END)
+                if cuenta.parent_code:
+                    widgets['entry_padre'].insert(0, cuenta.parent_code)
+                codigo_original.set(cuenta.code)
+                messagebox.showinfo("Éxito", "Cuenta encontrada.")
+            else:
+                messagebox.showerror("Error", "La cuenta no existe.")
+
+        en_segundo_plano(main_frame, buscar, codigo, exito=mostrar)
 
     def editar_cuenta():
         if not codigo_original.get():
@@ -329,26 +448,56 @@ def crear_cuentas_Estados_Financieros(frame):
             messagebox.showerror("Error", "El código y nombre son obligatorios.")
             return
 
-        if db.editar_cuenta(codigo_original.get(), codigo, nombre, padre):
-            actualizar_tabla()
-            limpiar_campos()
-            messagebox.showinfo("Éxito", "Cuenta actualizada correctamente")
-        else:
-            messagebox.showerror("Error", "No se pudo actualizar la cuenta.")
+        def terminar(editada):
+            if editada:
+                limpiar_campos()
+                messagebox.showinfo("Éxito", "Cuenta actualizada correctamente")
+            else:
+                messagebox.showerror("Error", "No se pudo actualizar la cuenta.")
+
+        en_segundo_plano(main_frame, AccountCatalog.editar_cuenta, codigo_original.get(), codigo, nombre, padre,
+                         exito=terminar)
 
     def eliminar_cuenta():
         if not codigo_original.get():
             messagebox.showerror("Error", "Primero debe buscar una cuenta para eliminar.")
             return
 
-        if messagebox.askyesno("Confirmar", "¿Está seguro de eliminar esta cuenta?"):
-            if db.eliminar_cuenta(codigo_original.get()):
-                actualizar_tabla()
+        def terminar(eliminada):
+            if eliminada:
                 limpiar_campos()
                 messagebox.showinfo("Éxito", "Cuenta eliminada correctamente")
             else:
                 messagebox.showerror("Error", "No se pudo eliminar la cuenta.")
 
+        if messagebox.askyesno("Confirmar", "¿Está seguro de eliminar esta cuenta?"):
+            en_segundo_plano(main_frame, AccountCatalog.eliminar_cuenta, codigo_original.get(), exito=terminar)
+
+    def importar_cuentas():
+        archivo = filedialog.askopenfilename(filetypes=[("Catálogo", "*.csv *.xlsx"), ("Todos los archivos", "*.*")])
+        if not archivo:
+            return
+
+        # La importación corre en el hilo de la base de datos; la ventana sigue respondiendo
+        boton_importar.config(state=tk.DISABLED, text="Importando...")
+
+        def terminar(resultado):
+            boton_importar.config(state=tk.NORMAL, text="Importar")
+            mensaje = f"{resultado.imported} cuentas importadas, {len(resultado.errors)} rechazadas."
+            if resultado.read_error:
+                mensaje += f"\nLa lectura del archivo se detuvo por un error: {resultado.read_error}"
+            if resultado.errors or resultado.read_error:
+                detalle = "\n".join(f"Fila {numero} ({code}): {motivo}" for numero, code, motivo in resultado.errors[:10])
+                messagebox.showwarning("Importación", f"{mensaje}\n\n{detalle}".rstrip())
+            else:
+                messagebox.showinfo("Importación", mensaje)
+
+        def fallar(e):
+            boton_importar.config(state=tk.NORMAL, text="Importar")
+            messagebox.showerror("Error", f"No se pudo importar el archivo: {e}")
+
+        en_segundo_plano(main_frame, AccountCatalog.import_accounts, archivo, exito=terminar, error=fallar)
+
     # Botones del frame de búsqueda
     botones = [
         ("Buscar Cuenta", buscar_cuenta),
@@ -380,9 +529,30 @@ def crear_cuentas_Estados_Financieros(frame):
         font=("Arial", 10, "bold")
     ).grid(row=len(campos), column=1, pady=10, sticky="w")
 
+    # Botón para importar un catálogo desde CSV o XLSX
+    boton_importar = tk.Button(
+        input_frame,
+        text="Importar",
+        command=importar_cuentas,
+        bg="#1E3A8A",
+        fg="white",
+        activebackground="#00587A",
+        width=15,
+        height=1,
+        font=("Arial", 10, "bold")
+    )
+    boton_importar.grid(row=len(campos), column=2, pady=10, sticky="w")
+
     # Inicializar tabla
     actualizar_tabla()
 
+# Opciones que muestra el selector de cuentas del balance; el resto se alcanza escribiendo
+LIMITE_OPCIONES = 50
+
+# PDF en generación; ReportLab no admite dos documentos a la vez en hilos distintos. Es del
+# módulo y no de la pantalla porque la generación sigue al cambiar de pantalla.
+_generando_pdf = threading.Event()
+
 def mostrar_balance_general(frame):
     for widget in frame.winfo_children():
         widget.destroy()
@@ -446,54 +616,76 @@ def mostrar_balance_general(frame):
     contenido_frame.grid_columnconfigure(0, weight=1)
     contenido_frame.grid_columnconfigure(1, weight=1)
 
+    # Filtrar cuentas según el tipo y la sección
+    filtro_codigo = {
+        'activo_corriente': '11',      # Activos Corrientes
+        'activo_no_corriente': '12',   # Activos No Corrientes
+        'pasivo_corriente': '21',      # Pasivos Corrientes
+        'pasivo_no_corriente': '22',   # Pasivos No Corrientes
+        'patrimonio': '3'              # Patrimonio
+    }
+
+    def resolver_cuenta(tipo_cuenta, codigo):
+        # Una línea solo toma el código de una cuenta del catálogo bajo el prefijo de su sección
+        # que no esté elegida en otra línea; se busca en el índice por prefijo
+        cuentas = obtener_catalogo().filter_descendants(filtro_codigo.get(tipo_cuenta, ''), codigo,
+                                                        secciones[tipo_cuenta][1], 1)
+        return cuentas[0].name if cuentas and cuentas[0].code == codigo else None
+
+    # Modelo con las líneas y los totales del formulario
+    balance = BalanceSheet(resolve_account=resolver_cuenta)
+
     def agregar_cuenta(parent_frame, tipo_cuenta, cuentas_seleccionadas):
         cuenta_frame = tk.Frame(parent_frame, bg="#E0F2FE")
         cuenta_frame.pack(fill=tk.X, padx=5, pady=2)
 
         # Combobox para seleccionar cuenta del catálogo
-        db = AccountCatalog("catalogo_cuentas.db")
-        cuentas = db.get_all_accounts()
-
-        # Filtrar cuentas según el tipo y la sección
-        filtro_codigo = {
-            'activo_corriente': '11',      # Activos Corrientes
-            'activo_no_corriente': '12',   # Activos No Corrientes
-            'pasivo_corriente': '21',      # Pasivos Corrientes
-            'pasivo_no_corriente': '22',   # Pasivos No Corrientes
-            'patrimonio': '3'              # Patrimonio
-        }
-
+        db = obtener_catalogo()
         codigo_filtro = filtro_codigo.get(tipo_cuenta, '')
 
-        # Filtrado específico basado en el tipo de cuenta
-        codigos_cuentas = []
-        for cuenta in cuentas:
-            if cuenta.code.startswith(codigo_filtro) and len(cuenta.code) > len(codigo_filtro) and cuenta.code not in cuentas_seleccionadas:
-                codigos_cuentas.append(f"{cuenta.code} - {cuenta.name}")
+        # Línea del modelo que refleja esta fila
+        linea = balance.add_line(tipo_cuenta)
+
+        def cuenta_cambiada(*args):
+            # Lo escrito se vuelve a resolver contra el catálogo; mientras no corresponda a una
+            # cuenta la línea queda sin código y no se puede guardar ni imprimir
+            cuentas_seleccionadas.discard(linea.code)
+            balance.update_line(linea, account_text=cuenta_var.get())
+            if linea.code:
+                cuentas_seleccionadas.add(linea.code)
+
+        cuenta_var = tk.StringVar()
+        cuenta_var.trace_add("write", cuenta_cambiada)
+
+        def actualizar_opciones():
+            # Solo las primeras coincidencias de la sección que aún no se han seleccionado;
+            # la lista se arma al abrirla o al escribir, no al crear la fila
+            cuenta_combo["values"] = [f"{cuenta.code} - {cuenta.name}"
+                                      for cuenta in db.filter_descendants(codigo_filtro, cuenta_var.get(),
+                                                                          cuentas_seleccionadas, LIMITE_OPCIONES)]
 
-        cuenta_combo = ttk.Combobox(cuenta_frame, values=codigos_cuentas, width=40)
+        cuenta_combo = ttk.Combobox(cuenta_frame, textvariable=cuenta_var, width=40, postcommand=actualizar_opciones)
         cuenta_combo.pack(side=tk.LEFT, padx=2)
+        cuenta_combo.bind("<KeyRelease>", lambda event: actualizar_opciones())
 
-        monto_entry = ttk.Entry(cuenta_frame, width=15)
+        monto_var = tk.StringVar()
+        monto_var.trace_add("write", lambda *args: balance.update_line(linea, amount_text=monto_var.get()))
+        monto_entry = ttk.Entry(cuenta_frame, textvariable=monto_var, width=15)
         monto_entry.pack(side=tk.LEFT, padx=2)
 
         def eliminar_fila():
             # Eliminar cuenta del conjunto de seleccionadas al eliminar la fila
-            cuenta_seleccionada = cuenta_combo.get().split(' - ')[0]
-            cuentas_seleccionadas.discard(cuenta_seleccionada)  # Quitar del registro de seleccionadas
+            cuentas_seleccionadas.discard(linea.code)  # Quitar del registro de seleccionadas
+            balance.remove_line(linea)
             cuenta_frame.destroy()
-            actualizar_totales()
 
         ttk.Button(cuenta_frame, text="X", width=3, command=eliminar_fila).pack(side=tk.LEFT, padx=2)
 
-        # Verificar si se seleccionó una cuenta
+        # Verificar si se seleccionó una cuenta; si no quedó asignada es porque otra línea ya la tiene
         def on_combo_select(event):
-            cuenta_seleccionada = cuenta_combo.get().split(' - ')[0]
-            if cuenta_seleccionada in cuentas_seleccionadas:
+            if not linea.code:
                 messagebox.showerror("Error", "Esta cuenta ya ha sido seleccionada.")
                 cuenta_combo.set('')  # Limpiar la selección si ya está elegida
-            else:
-                cuentas_seleccionadas.add(cuenta_seleccionada)  # Agregar cuenta al registro de seleccionadas
 
         cuenta_combo.bind("<<ComboboxSelected>>", on_combo_select)
 
@@ -509,6 +701,11 @@ def mostrar_balance_general(frame):
                 command=lambda: agregar_cuenta(seccion_frame, tipo_cuenta, cuentas_seleccionadas)
             ).pack(anchor=tk.W, padx=5, pady=5)
 
+        secciones[tipo_cuenta] = (seccion_frame, cuentas_seleccionadas)
+
+    # Frame y cuentas seleccionadas de cada sección, por tipo de cuenta
+    secciones = {}
+
     # Secciones de Activos con sus respectivos conjuntos de cuentas
     agregar_seccion(activos_frame, "ACTIVOS CORRIENTES", "activo_corriente", cuentas_seleccionadas_activo_corriente)
     agregar_seccion(activos_frame, "ACTIVOS NO CORRIENTES", "activo_no_corriente", cuentas_seleccionadas_activo_no_corriente)
@@ -530,26 +727,36 @@ def mostrar_balance_general(frame):
     total_pasivos_label = tk.Label(totales_frame, text="Total Pasivos y Patrimonio: $0.00", bg="#E0F2FE", font=("Arial", 12, "bold"))
     total_pasivos_label.pack(side=tk.RIGHT, padx=20)
 
-    def actualizar_totales():
-        # Conectar a la base de datos
-        conn = sqlite3.connect('catalogo_cuentas.db')
-        cursor = conn.cursor()
-
-        # Sumar los totales de activos, pasivos y capital
-        cursor.execute("SELECT SUM(monto) FROM cuentas_balance WHERE tipo IN ('Activo Circulante', 'Activo No Circulante')")
-        total_activos = cursor.fetchone()[0] or 0
+    estado_label = tk.Label(totales_frame, text="", bg="#E0F2FE", font=("Arial", 12, "bold"))
+    estado_label.pack(side=tk.LEFT, expand=True)
 
-        cursor.execute("SELECT SUM(monto) FROM cuentas_balance WHERE tipo IN ('Pasivo Circulante', 'Pasivo No Circulante')")
-        total_pasivos = cursor.fetchone()[0] or 0
+    # Identificador del after() pendiente para agrupar cambios seguidos al escribir
+    refresco_pendiente = None
 
-        cursor.execute("SELECT SUM(monto) FROM cuentas_balance WHERE tipo = 'Capital'")
-        total_capital = cursor.fetchone()[0] or 0
+    def refrescar_totales():
+        nonlocal refresco_pendiente
+        refresco_pendiente = None
+        if not totales_frame.winfo_exists():
+            return
+        total_activos_label.config(text=f"Total Activos: ${balance.total_activos:,.2f}")
+        total_pasivos_label.config(
+            text=f"Total Pasivos y Patrimonio: ${balance.total_pasivos + balance.total_patrimonio:,.2f}")
+        diferencia = balance.difference
+        if not balance.lines():
+            estado_label.config(text="")
+        elif diferencia == 0:
+            estado_label.config(text="Balance cuadrado", fg="#15803D")
+        else:
+            estado_label.config(text=f"No cuadra (diferencia ${diferencia:,.2f})", fg="#DC2626")
 
-        # Calcular el capital usando la fórmula: Activo = Pasivo + Capital
-        balance_equilibrado = (total_activos == total_pasivos + total_capital)
+    def programar_totales():
+        # Los totales salen del modelo en memoria; solo se redibuja tras una pausa corta
+        nonlocal refresco_pendiente
+        if refresco_pendiente is not None:
+            totales_frame.after_cancel(refresco_pendiente)
+        refresco_pendiente = totales_frame.after(150, refrescar_totales)
 
-        conn.close()
-        return total_activos, total_pasivos, total_capital, balance_equilibrado
+    balance.on_change = programar_totales
 
     # Frame para botones de acción
     botones_frame = tk.Frame(frame, bg="#E0F2FE")
@@ -571,102 +778,47 @@ def mostrar_balance_general(frame):
             messagebox.showerror("Error", "El formato de fecha debe ser dd/mm/yyyy")
             return
 
-        # Obtener todos los frames de cuentas
-        total_activos = 0
-        total_pasivos = 0
-        total_patrimonio = 0
-        
-        # Bandera para verificar si hay al menos una cuenta en cada sección
-        tiene_activos = False
-        tiene_pasivos = False
-        tiene_patrimonio = False
+        # Líneas del balance: (seccion, codigo, nombre, monto)
+        lineas = []
+        for linea in balance.lines():
+            if not linea.amount_text:
+                continue
 
-        # Función auxiliar para extraer y validar el monto de un entry
-        def extraer_monto(entry, combo):
-            try:
-                texto = entry.get().strip()
-                if not texto:
-                    return 0
-                    
-                # Verificar que se haya seleccionado una cuenta
-                if not combo.get().strip():
-                    messagebox.showerror("Error", "Debe seleccionar una cuenta para cada entrada")
-                    return None
-                    
-                if validar_dos_decimales(texto):
-                    # Validar que el monto sea positivo
-                    monto = float(texto.replace('$', '').replace(',', ''))
-                    if monto <= 0:
-                        messagebox.showerror("Error", "Los montos deben ser mayores a cero")
-                        return None
-                    return monto
-                else:
-                    messagebox.showerror("Error", "El monto debe tener un máximo de dos decimales")
-                    return None
-            except ValueError:
-                messagebox.showerror("Error", "Monto inválido")
-                return None
-
-        # Recorrer todos los frames de activos
-        for child in activos_frame.winfo_children():
-            if isinstance(child, tk.LabelFrame):  # Verificar si es un frame de sección
-                for cuenta_frame in child.winfo_children():
-                    if isinstance(cuenta_frame, tk.Frame):
-                        combo = None
-                        entry = None
-                        # Buscar el combobox y entry en el frame de la cuenta
-                        for widget in cuenta_frame.winfo_children():
-                            if isinstance(widget, ttk.Combobox):
-                                combo = widget
-                            elif isinstance(widget, ttk.Entry):
-                                entry = widget
-                        
-                        if combo and entry:
-                            monto = extraer_monto(entry, combo)
-                            if monto is None:  # Si hay error en la validación
-                                return
-                            if monto > 0:
-                                tiene_activos = True
-                                total_activos += monto
-
-        # Recorrer todos los frames de pasivos y patrimonio
-        for child in pasivos_frame.winfo_children():
-            if isinstance(child, tk.LabelFrame):
-                for cuenta_frame in child.winfo_children():
-                    if isinstance(cuenta_frame, tk.Frame):
-                        combo = None
-                        entry = None
-                        for widget in cuenta_frame.winfo_children():
-                            if isinstance(widget, ttk.Combobox):
-                                combo = widget
-                            elif isinstance(widget, ttk.Entry):
-                                entry = widget
-                        
-                        if combo and entry:
-                            monto = extraer_monto(entry, combo)
-                            if monto is None:  # Si hay error en la validación
-                                return
-                            if monto > 0:
-                                if "PASIVO" in child.cget("text"):
-                                    tiene_pasivos = True
-                                    total_pasivos += monto
-                                else:  # Es patrimonio
-                                    tiene_patrimonio = True
-                                    total_patrimonio += monto
+            # Verificar que se haya seleccionado una cuenta
+            if not linea.code:
+                messagebox.showerror("Error", "Debe seleccionar de la lista una cuenta del catálogo para cada entrada")
+                return
+
+            if not linea.valid:
+                messagebox.showerror("Error", "El monto debe tener un máximo de dos decimales")
+                return
+
+            # Validar que el monto sea positivo
+            if linea.cents <= 0:
+                messagebox.showerror("Error", "Los montos deben ser mayores a cero")
+                return
+
+            lineas.append((linea.section, linea.code, linea.name, linea.amount))
 
         # Validar que haya al menos una cuenta en cada sección
-        if not tiene_activos:
+        secciones_con_montos = {seccion for seccion, _, _, _ in lineas}
+        if not secciones_con_montos.intersection(SECCIONES_ACTIVO):
             messagebox.showerror("Error", "Debe incluir al menos una cuenta de activos")
             return
-        
-        if not tiene_pasivos:
+
+        if not secciones_con_montos.intersection(SECCIONES_PASIVO):
             messagebox.showerror("Error", "Debe incluir al menos una cuenta de pasivos")
             return
-            
-        if not tiene_patrimonio:
+
+        if "patrimonio" not in secciones_con_montos:
             messagebox.showerror("Error", "Debe incluir al menos una cuenta de patrimonio")
             return
 
+        # Totales mantenidos por el modelo
+        total_activos = balance.total_activos
+        total_pasivos = balance.total_pasivos
+        total_patrimonio = balance.total_patrimonio
+
         # Verificar que los totales cuadren (permitiendo una pequeña diferencia por redondeo)
         diferencia = abs(total_activos - (total_pasivos + total_patrimonio))
         if diferencia > 0.01:
@@ -676,46 +828,35 @@ def mostrar_balance_general(frame):
                 f"Diferencia: ${diferencia:,.2f}")
             return
 
-        try:
-            # Crear la tabla si no existe
-            conn = sqlite3.connect('catalogo_cuentas.db')
-            cursor = conn.cursor()
-
-            cursor.execute('''
-            CREATE TABLE IF NOT EXISTS balance_general (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                fecha TEXT,
-                empresa TEXT,
-                total_activos REAL,
-                total_pasivos REAL,
-                total_patrimonio REAL,
-                fecha_registro TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-            ''')
-
-            # Guardar el balance
-            cursor.execute('''
-            INSERT INTO balance_general (fecha, empresa, total_activos, total_pasivos, total_patrimonio)
-            VALUES (?, ?, ?, ?, ?)
-            ''', (fecha, empresa_entry.get().strip(), total_activos, total_pasivos, total_patrimonio))
-
-            conn.commit()
-            conn.close()
-
-            # Actualizar las etiquetas de totales
-            total_activos_label.config(text=f"Total Activos: ${total_activos:,.2f}")
-            total_pasivos_label.config(text=f"Total Pasivos y Patrimonio: ${total_pasivos + total_patrimonio:,.2f}")
-
-            messagebox.showinfo("Éxito", "Balance guardado correctamente")
-        except Exception as e:
-            messagebox.showerror("Error", f"Error al guardar el balance: {str(e)}")
+        # Cada cuenta solo puede aparecer una vez en el balance
+        codigos = [codigo for _, codigo, _, _ in lineas]
+        repetidas = sorted({codigo for codigo in codigos if codigos.count(codigo) > 1})
+        if repetidas:
+            messagebox.showerror("Error", f"Cuentas repetidas en el balance: {', '.join(repetidas)}")
+            return
+
+        # Guardar el balance con sus líneas en el hilo de la base de datos
+        en_segundo_plano(frame,
+                         lambda catalogo, *datos: guardar_balance_general(catalogo.conn, *datos),
+                         fecha, empresa_entry.get().strip(), total_activos, total_pasivos, total_patrimonio, lineas,
+                         exito=lambda _: messagebox.showinfo("Éxito", "Balance guardado correctamente"),
+                         error=lambda e: messagebox.showerror("Error", f"Error al guardar el balance: {str(e)}"))
 
     def generar_pdf():
+        if _generando_pdf.is_set():
+            messagebox.showinfo("Generar PDF", "Ya se está generando un PDF; espere a que termine o cancélelo.")
+            return
+
         # Validar que haya datos para generar el PDF
         if not fecha_entry.get().strip() or not empresa_entry.get().strip():
             messagebox.showerror("Error", "Debe ingresar la fecha y el nombre de la empresa")
             return
 
+        # Los totales del modelo incluyen todos los montos, así que cada uno debe tener cuenta
+        if any(linea.cents > 0 and not linea.code for linea in balance.lines()):
+            messagebox.showerror("Error", "Debe seleccionar de la lista una cuenta del catálogo para cada entrada")
+            return
+
         # Solicitar ubicación para guardar el PDF
         file_path = filedialog.asksaveasfilename(
             defaultextension=".pdf",
@@ -726,302 +867,207 @@ def mostrar_balance_general(frame):
         if not file_path:  # Si el usuario cancela la selección
             return
 
-        try:
-            # Crear el documento PDF
-            doc = SimpleDocTemplate(
-                file_path,
-                pagesize=letter,
-                rightMargin=72,
-                leftMargin=72,
-                topMargin=72,
-                bottomMargin=72
-            )
-
-            # Lista para almacenar los elementos del PDF
-            elements = []
-
-            # Estilos
-            styles = getSampleStyleSheet()
-            title_style = ParagraphStyle(
-                'CustomTitle',
-                parent=styles['Heading1'],
-                fontSize=16,
-                alignment=1,  # Centrado
-                spaceAfter=30
-            )
-            
-            subtitle_style = ParagraphStyle(
-                'CustomSubTitle',
-                parent=styles['Heading2'],
-                fontSize=12,
-                alignment=1,
-                spaceAfter=20
-            )
-            
-            normal_style = styles["Normal"]
-            
-            # Título y encabezado
-            elements.append(Paragraph(empresa_entry.get().strip().upper(), title_style))
-            elements.append(Paragraph("BALANCE GENERAL", title_style))
-            elements.append(Paragraph(f"Al {fecha_entry.get()}", subtitle_style))
-            elements.append(Paragraph(f"(Expresado en dólares de los Estados Unidos de América)", subtitle_style))
-            elements.append(Spacer(1, 20))
-
-            # Recolectar datos de activos
-            activos_data = [["ACTIVOS", "Monto"]]
-            total_activos = 0
-            
-            # Función auxiliar para extraer monto con validación
-            def extraer_monto(entry):
+        # Copia de los datos para que el hilo de trabajo no lea widgets ni el modelo
+        empresa = empresa_entry.get().strip()
+        fecha = fecha_entry.get()
+        lineas = [(linea.section, linea.code, linea.name, linea.amount)
+                  for linea in balance.lines() if linea.code and linea.valid and linea.cents > 0]
+
+        # Ventana de progreso con opción de cancelar. Depende de la ventana principal y no de
+        # frame, que se vacía al cambiar de pantalla mientras el PDF se sigue generando
+        raiz = frame.winfo_toplevel()
+        ventana = tk.Toplevel(raiz)
+        ventana.title("Generando PDF")
+        ventana.configure(bg="#E0F2FE")
+        ventana.transient(raiz)
+
+        estado_label = tk.Label(ventana, text="Preparando documento...", bg="#E0F2FE", font=("Arial", 10))
+        estado_label.pack(padx=20, pady=(15, 5))
+        barra = ttk.Progressbar(ventana, length=300, maximum=1.0)
+        barra.pack(padx=20, pady=5)
+
+        cancelar = threading.Event()
+        mensajes = queue.Queue()
+        ttk.Button(ventana, text="Cancelar", command=cancelar.set).pack(pady=(5, 15))
+        # Cerrar la ventana equivale a cancelar; se destruye cuando el hilo lo confirma
+        ventana.protocol("WM_DELETE_WINDOW", cancelar.set)
+
+        def trabajar():
+            # ReportLab se carga aquí, la primera vez que se genera un PDF, y no al iniciar
+            try:
+                from reportes import PdfCancelado, construir_pdf_balance
+            except ImportError as e:
+                mensajes.put(("error", e))
+                return
+
+            try:
+                construir_pdf_balance(file_path, empresa, fecha, lineas,
+                                      progreso=lambda fraccion, pagina: mensajes.put(("progreso", fraccion, pagina)),
+                                      cancelado=cancelar.is_set)
+                mensajes.put(("listo",))
+            except PdfCancelado:
+                mensajes.put(("cancelado",))
+            except Exception as e:
+                mensajes.put(("error", e))
+
+        def revisar_mensajes():
+            # Los mensajes del hilo se procesan en el hilo de Tk mediante after(). Si la ventana
+            # de progreso ya no existe se sigue vaciando la cola para informar el resultado.
+            while True:
                 try:
-                    texto = entry.get().strip()
-                    if texto and validar_dos_decimales(texto):
-                        return float(texto.replace('$', '').replace(',', ''))
-                except ValueError:
-                    pass
-                return 0  # Devuelve 0 si el campo está vacío o es inválido
-
-            
-           # Conjunto para rastrear las cuentas ya procesadas y evitar duplicación
-            cuentas_procesadas = set()
-
-            # Procesar activos corrientes
-            activos_corrientes = []
-            activos_corrientes_total = 0
-            for child in activos_frame.winfo_children():
-                if isinstance(child, tk.LabelFrame) and "CORRIENTES" in child.cget("text"):
-                    for cuenta_frame in child.winfo_children():
-                        if isinstance(cuenta_frame, tk.Frame):
-                            combo = None
-                            entry = None
-                            for widget in cuenta_frame.winfo_children():
-                                if isinstance(widget, ttk.Combobox):
-                                    combo = widget
-                                elif isinstance(widget, ttk.Entry):
-                                    entry = widget
-                            if combo and entry and combo.get().strip():
-                                monto = extraer_monto(entry)
-                                if monto > 0:
-                                    cuenta = combo.get()
-                                    # Verificar si la cuenta ya ha sido procesada y pertenece a "Activos Corrientes"
-                                    if cuenta not in cuentas_procesadas and cuenta.startswith("11"):
-                                        activos_corrientes.append(["    " + cuenta, f"${monto:,.2f}"])
-                                        activos_corrientes_total += monto
-                                        cuentas_procesadas.add(cuenta)  # Añadir la cuenta al conjunto
-
-            # Añadir datos de activos corrientes al PDF
-            if activos_corrientes:
-                activos_data.append(["ACTIVOS CORRIENTES", ""])
-                activos_data.extend(activos_corrientes)
-                activos_data.append(["Total Activos Corrientes", f"${activos_corrientes_total:,.2f}"])
-                total_activos += activos_corrientes_total
-
-            # Procesar activos no corrientes
-            activos_no_corrientes = []
-            activos_no_corrientes_total = 0
-            for child in activos_frame.winfo_children():
-                if isinstance(child, tk.LabelFrame) and "NO CORRIENTES" in child.cget("text"):
-                    for cuenta_frame in child.winfo_children():
-                        if isinstance(cuenta_frame, tk.Frame):
-                            combo = None
-                            entry = None
-                            for widget in cuenta_frame.winfo_children():
-                                if isinstance(widget, ttk.Combobox):
-                                    combo = widget
-                                elif isinstance(widget, ttk.Entry):
-                                    entry = widget
-                            if combo and entry and combo.get().strip():
-                                monto = extraer_monto(entry)
-                                if monto > 0:
-                                    cuenta = combo.get()
-                                    # Verificar si la cuenta ya ha sido procesada y pertenece a "Activos No Corrientes"
-                                    if cuenta not in cuentas_procesadas and cuenta.startswith("12"):
-                                        activos_no_corrientes.append(["    " + cuenta, f"${monto:,.2f}"])
-                                        activos_no_corrientes_total += monto
-                                        cuentas_procesadas.add(cuenta)  # Añadir la cuenta al conjunto
-
-            # Añadir datos de activos no corrientes al PDF
-            if activos_no_corrientes:
-                activos_data.append(["ACTIVOS NO CORRIENTES", ""])
-                activos_data.extend(activos_no_corrientes)
-                activos_data.append(["Total Activos No Corrientes", f"${activos_no_corrientes_total:,.2f}"])
-                total_activos += activos_no_corrientes_total
-
-            # Añadir total de activos al PDF
-            activos_data.append(["TOTAL ACTIVOS", f"${total_activos:,.2f}"])
-
-            # Crear tabla de activos
-            activos_table = Table(activos_data, colWidths=[4*inch, 2*inch])
-            activos_table.setStyle(TableStyle([
-                ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-                ('ALIGN', (1, 0), (1, -1), 'RIGHT'),
-                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                ('FONTSIZE', (0, 0), (-1, 0), 12),
-                ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-                ('TEXTCOLOR', (0, -1), (-1, -1), colors.black),
-                ('FONTNAME', (0, -1), (-1, -1), 'Helvetica-Bold'),
-                ('TOPPADDING', (0, -1), (-1, -1), 12),
-                ('LINEBELOW', (0, -1), (-1, -1), 1, colors.black),
-            ]))
-
-            elements.append(activos_table)
-            elements.append(Spacer(1, 20))
-
-            # Conjunto para rastrear las cuentas ya procesadas y evitar duplicación
-            cuentas_procesadas = set()
-
-            # Recolectar datos de pasivos y patrimonio
-            pasivos_patrimonio_data = [["PASIVOS Y PATRIMONIO", "Monto"]]
-            total_pasivos = 0
-            total_patrimonio = 0
-
-            # Procesar pasivos corrientes
-            pasivos_corrientes = []
-            pasivos_corrientes_total = 0
-            for child in pasivos_frame.winfo_children():
-                if isinstance(child, tk.LabelFrame) and "CORRIENTES" in child.cget("text"):
-                    for cuenta_frame in child.winfo_children():
-                        if isinstance(cuenta_frame, tk.Frame):
-                            combo = None
-                            entry = None
-                            for widget in cuenta_frame.winfo_children():
-                                if isinstance(widget, ttk.Combobox):
-                                    combo = widget
-                                elif isinstance(widget, ttk.Entry):
-                                    entry = widget
-                            if combo and entry and combo.get().strip():
-                                monto = extraer_monto(entry)
-                                if monto > 0:
-                                     cuenta = combo.get()
-                                    # Verificar si la cuenta ya ha sido procesada y pertenece a "Pasivos Corrientes"
-                                if cuenta not in cuentas_procesadas and cuenta.startswith("21"):
-                                        pasivos_corrientes.append(["    " + cuenta, f"${monto:,.2f}"])
-                                        pasivos_corrientes_total += monto
-                                        cuentas_procesadas.add(cuenta)  # Añadir la cuenta al conjunto
-
-            # Añadir datos de pasivos corrientes al PDF
-            if pasivos_corrientes:
-                pasivos_patrimonio_data.append(["PASIVOS CORRIENTES", ""])
-                pasivos_patrimonio_data.extend(pasivos_corrientes)
-                pasivos_patrimonio_data.append(["Total Pasivos Corrientes", f"${pasivos_corrientes_total:,.2f}"])
-                total_pasivos += pasivos_corrientes_total
-
-            # Procesar pasivos no corrientes
-            pasivos_no_corrientes = []
-            pasivos_no_corrientes_total = 0
-            for child in pasivos_frame.winfo_children():
-                if isinstance(child, tk.LabelFrame) and "NO CORRIENTES" in child.cget("text"):
-                    for cuenta_frame in child.winfo_children():
-                        if isinstance(cuenta_frame, tk.Frame):
-                            combo = None
-                            entry = None
-                            for widget in cuenta_frame.winfo_children():
-                                if isinstance(widget, ttk.Combobox):
-                                    combo = widget
-                                elif isinstance(widget, ttk.Entry):
-                                    entry = widget
-                            if combo and entry and combo.get().strip():
-                                monto = extraer_monto(entry)
-                                if monto > 0:
-                                      cuenta = combo.get()
-                                # Verificar si la cuenta ya ha sido procesada y pertenece a "Pasivos No Corrientes"
-                                if cuenta not in cuentas_procesadas and cuenta.startswith("22"):
-                                    pasivos_no_corrientes.append(["    " + cuenta, f"${monto:,.2f}"])
-                                    pasivos_no_corrientes_total += monto
-                                    cuentas_procesadas.add(cuenta)  # Añadir la cuenta al conjunto
-                                    
-            # Añadir datos de pasivos no corrientes al PDF
-            if pasivos_no_corrientes:
-                pasivos_patrimonio_data.append(["PASIVOS NO CORRIENTES", ""])
-                pasivos_patrimonio_data.extend(pasivos_no_corrientes)
-                pasivos_patrimonio_data.append(["Total Pasivos No Corrientes", f"${pasivos_no_corrientes_total:,.2f}"])
-                total_pasivos += pasivos_no_corrientes_total
-
-            # Añadir total de pasivos
-            pasivos_patrimonio_data.append(["TOTAL PASIVOS", f"${total_pasivos:,.2f}"])
-
-            # Procesar patrimonio
-            patrimonio_items = []
-            for child in pasivos_frame.winfo_children():
-                if isinstance(child, tk.LabelFrame) and "PATRIMONIO" in child.cget("text"):
-                    for cuenta_frame in child.winfo_children():
-                        if isinstance(cuenta_frame, tk.Frame):
-                            combo = None
-                            entry = None
-                            for widget in cuenta_frame.winfo_children():
-                                if isinstance(widget, ttk.Combobox):
-                                    combo = widget
-                                elif isinstance(widget, ttk.Entry):
-                                    entry = widget
-                            if combo and entry and combo.get().strip():
-                                monto = extraer_monto(entry)
-                                if monto > 0:
-                                    cuenta = combo.get().split(' - ')[1]
-                                    # Verificar que la cuenta no haya sido procesada anteriormente
-                                    if cuenta not in cuentas_procesadas:
-                                        patrimonio_items.append(["    " + cuenta, f"${monto:,.2f}"])
-                                        total_patrimonio += monto
-                                        cuentas_procesadas.add(cuenta)  # Añadir la cuenta al conjunto
-
-            # Añadir datos de patrimonio al PDF
-            if patrimonio_items:
-                pasivos_patrimonio_data.append(["PATRIMONIO", ""])
-                pasivos_patrimonio_data.extend(patrimonio_items)
-                pasivos_patrimonio_data.append(["TOTAL PATRIMONIO", f"${total_patrimonio:,.2f}"])
-
-            # Calcular y añadir total de pasivos y patrimonio
-            total_pasivos_y_patrimonio = total_pasivos + total_patrimonio
-            pasivos_patrimonio_data.append(["TOTAL PASIVOS Y PATRIMONIO", f"${total_pasivos_y_patrimonio:,.2f}"])
-
-
-            # Crear tabla de pasivos y patrimonio
-            pasivos_patrimonio_table = Table(pasivos_patrimonio_data, colWidths=[4*inch, 2*inch])
-            pasivos_patrimonio_table.setStyle(TableStyle([
-                ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-                ('ALIGN', (1, 0), (1, -1), 'RIGHT'),
-                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                ('FONTSIZE', (0, 0), (-1, 0), 12),
-                ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-                ('TEXTCOLOR', (0, -1), (-1, -1), colors.black),
-                ('FONTNAME', (0, -1), (-1, -1), 'Helvetica-Bold'),
-                ('TOPPADDING', (0, -1), (-1, -1), 12),
-                ('LINEBELOW', (0, -1), (-1, -1), 1, colors.black),
-            ]))
-
-            elements.append(pasivos_patrimonio_table)
-            
-            # Agregar espacio para firmas
-            elements.append(Spacer(1, 50))
-            
-            # Crear tabla para firmas
-            firma_data = [
-                ["_______________________", "_______________________", "_______________________"],
-                ["Representante Legal", "Contador", "Auditor"],
-            ]
-            firma_table = Table(firma_data, colWidths=[2.5*inch, 2.5*inch, 2.5*inch])
-            firma_table.setStyle(TableStyle([
-                ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                ('FONTNAME', (0, 1), (-1, 1), 'Helvetica'),
-                ('FONTSIZE', (0, 1), (-1, 1), 10),
-                ('TOPPADDING', (0, 1), (-1, 1), 5),
-            ]))
-            
-            elements.append(firma_table)
-
-            # Generar el PDF
-            doc.build(elements)
-            
-            # Mostrar mensaje de éxito y preguntar si desea abrir el PDF
-            if messagebox.askyesno("Éxito", "PDF generado correctamente. ¿Desea abrirlo?"):
-                os.startfile(file_path) if os.name == 'nt' else os.system(f'xdg-open {file_path}')
-
-        except Exception as e:
-            messagebox.showerror("Error", f"Error al generar el PDF: {str(e)}")
+                    mensaje = mensajes.get_nowait()
+                except queue.Empty:
+                    break
+                if mensaje[0] == "progreso":
+                    if ventana.winfo_exists():
+                        barra["value"] = mensaje[1]
+                        estado_label.config(text=f"Generando página {mensaje[2] or 1}...")
+                    continue
+                # "listo", "cancelado" o "error": ya se puede generar otro
+                _generando_pdf.clear()
+                if boton_pdf.winfo_exists():
+                    boton_pdf.config(state=tk.NORMAL)
+                if ventana.winfo_exists():
+                    ventana.destroy()
+                if mensaje[0] == "listo":
+                    # Mostrar mensaje de éxito y preguntar si desea abrir el PDF
+                    if messagebox.askyesno("Éxito", "PDF generado correctamente. ¿Desea abrirlo?"):
+                        os.startfile(file_path) if os.name == 'nt' else os.system(f'xdg-open {file_path}')
+                elif mensaje[0] == "error":
+                    messagebox.showerror("Error", f"Error al generar el PDF: {str(mensaje[1])}")
+                return
+            raiz.after(50, revisar_mensajes)
+
+        _generando_pdf.set()
+        boton_pdf.config(state=tk.DISABLED)
+        threading.Thread(target=trabajar, daemon=True).start()
+        raiz.after(50, revisar_mensajes)
+
+    def cargar_en_formulario(balance_id):
+        guardado = cargar_balance_general(obtener_catalogo().conn, balance_id)
+        if guardado is None:
+            messagebox.showerror("Error", "El balance no existe.")
+            return
+        fecha, empresa, lineas = guardado
+
+        # Limpiar las filas actuales del formulario
+        balance.clear()
+        for seccion_frame, cuentas_seleccionadas in secciones.values():
+            for widget in seccion_frame.winfo_children():
+                if isinstance(widget, tk.Frame):
+                    widget.destroy()
+            cuentas_seleccionadas.clear()
+
+        fecha_entry.delete(0, tk.END)
+        fecha_entry.insert(0, fecha or "")
+        empresa_entry.delete(0, tk.END)
+        empresa_entry.insert(0, empresa or "")
+
+        for seccion, codigo, nombre, monto in lineas:
+            if seccion not in secciones:
+                continue
+            seccion_frame, cuentas_seleccionadas = secciones[seccion]
+            cuenta_combo, monto_entry = agregar_cuenta(seccion_frame, seccion, cuentas_seleccionadas)
+            cuenta_combo.set(f"{codigo} - {nombre}")
+            monto_entry.insert(0, f"{monto:.2f}")
+
+    def abrir_balance():
+        balances = listar_balances_generales(obtener_catalogo().conn)
+        if not balances:
+            messagebox.showinfo("Balances", "No hay balances guardados.")
+            return
+
+        ventana = tk.Toplevel(frame)
+        ventana.title("Abrir Balance")
+        ventana.configure(bg="#E0F2FE")
+
+        lista = ttk.Treeview(ventana, columns=("Fecha", "Empresa", "Total Activos"), show='headings', height=10)
+        for col in lista['columns']:
+            lista.heading(col, text=col)
+            lista.column(col, width=150)
+        lista.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+
+        for balance_id, fecha, empresa, total_activos, _, _ in balances:
+            lista.insert("", tk.END, iid=str(balance_id), values=(fecha, empresa, f"${total_activos:,.2f}"))
+
+        def abrir_seleccionado(event=None):
+            seleccion = lista.selection()
+            if not seleccion:
+                return
+            ventana.destroy()
+            cargar_en_formulario(int(seleccion[0]))
+
+        lista.bind("<Double-1>", abrir_seleccionado)
+        ttk.Button(ventana, text="Abrir", command=abrir_seleccionado).pack(pady=(0, 10))
 
     ttk.Button(botones_frame, text="Guardar Balance", command=guardar_balance).pack(side=tk.LEFT, padx=5)
-    ttk.Button(botones_frame, text="Generar PDF", command=generar_pdf).pack(side=tk.LEFT, padx=5)
+    ttk.Button(botones_frame, text="Abrir Balance", command=abrir_balance).pack(side=tk.LEFT, padx=5)
+    boton_pdf = ttk.Button(botones_frame, text="Generar PDF", command=generar_pdf)
+    boton_pdf.pack(side=tk.LEFT, padx=5)
 
-def menu_principal():
+def mostrar_diagnostico(frame):
+    for widget in frame.winfo_children():
+        widget.destroy()
+
+    frame.configure(bg="#E0F2FE")
+
+    main_frame = tk.Frame(frame, bg="#E0F2FE")
+    main_frame.pack(fill=tk.BOTH, expand=True, padx=20, pady=20)
+
+    tk.Label(main_frame,
+             text="Diagnóstico de la Base de Datos",
+             bg="#E0F2FE",
+             font=("Arial", 16, "bold"),
+             fg="#1E3A8A").pack(pady=(0, 10))
+
+    resumen = tk.Label(main_frame, bg="#E0F2FE", font=("Arial", 11, "bold"), fg="#1E3A8A")
+    resumen.pack(pady=(0, 10))
+
+    table_frame = tk.Frame(main_frame, bg="#E0F2FE", relief="raised", borderwidth=1)
+    table_frame.pack(fill=tk.BOTH, expand=True)
+
+    # Una columna por intervalo del histograma de latencias
+    limites = diagnostico.LIMITES_HISTOGRAMA
+    intervalos = [f"<{limite} ms" for limite in limites] + [f">={limites[-1]} ms"]
+    columnas = ("Sentencia", "Ejecuciones", "Total ms", "Promedio ms", "Máximo ms", "Filas") + tuple(intervalos)
+    tabla = ttk.Treeview(table_frame, columns=columnas, show='headings', height=20)
+    for columna in columnas:
+        tabla.heading(columna, text=columna)
+        tabla.column(columna, width=420 if columna == "Sentencia" else 80, anchor=tk.W if columna == "Sentencia" else tk.E)
+    scrollbar = ttk.Scrollbar(table_frame, orient=tk.VERTICAL, command=tabla.yview)
+    tabla.configure(yscrollcommand=scrollbar.set)
+    tabla.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+    scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+
+    def refrescar():
+        # Se detiene solo cuando se cambia de pantalla y la tabla deja de existir
+        if not tabla.winfo_exists():
+            return
+        conexiones, estadisticas = diagnostico.instantanea()
+        total = sum(valor["ejecuciones"] for valor in estadisticas.values())
+        resumen.config(text=f"Conexiones creadas: {conexiones}    Consultas: {total}    "
+                            f"Umbral de consulta lenta: {diagnostico.umbral_lento_ms:g} ms")
+        # Las sentencias más costosas primero; iid = sentencia para actualizar en su lugar
+        ordenadas = sorted(estadisticas.items(), key=lambda item: item[1]["tiempo_total_ms"], reverse=True)
+        for posicion, (sql, valor) in enumerate(ordenadas):
+            valores = (sql, valor["ejecuciones"], f"{valor['tiempo_total_ms']:.2f}",
+                       f"{valor['tiempo_total_ms'] / valor['ejecuciones']:.3f}", f"{valor['tiempo_max_ms']:.2f}",
+                       valor["filas"], *valor["histograma"])
+            if tabla.exists(sql):
+                tabla.item(sql, values=valores)
+                tabla.move(sql, '', posicion)
+            else:
+                tabla.insert('', posicion, iid=sql, values=valores)
+        frame.after(1000, refrescar)
+
+    def reiniciar():
+        diagnostico.reiniciar()
+        tabla.delete(*tabla.get_children())
+
+    ttk.Button(main_frame, text="Reiniciar contadores", command=reiniciar).pack(pady=10)
+    refrescar()
+
+def crear_menu_principal():
     ventana_principal = tk.Tk()
     ventana_principal.title("Sistema de Contabilidad")
     ventana_principal.geometry("1200x600")
@@ -1040,6 +1086,7 @@ def menu_principal():
         ("Crear Cuenta - Para catalogo de cuentas", lambda: crear_cuentas_Estados_Financieros(frame_contenido)),
         ("Mostrar Estado de Resultado", None),
         ("Mostrar Balance General", lambda: mostrar_balance_general(frame_contenido)),
+        ("Diagnóstico", lambda: mostrar_diagnostico(frame_contenido)),
         ("Salir", lambda: cerrar_aplicacion(ventana_principal))
     ]
 
@@ -1048,9 +1095,13 @@ def menu_principal():
         tk.Button(frame_botones, text=texto, command=comando, bg=color, fg="white", activebackground="#00587A", width=33, height=2, font=("Arial", 10, "bold")).pack(pady=5)
 
     ventana_principal.protocol("WM_DELETE_WINDOW", lambda: cerrar_aplicacion(ventana_principal))
-    ventana_principal.mainloop()
+    return ventana_principal
+
+def menu_principal():
+    crear_menu_principal().mainloop()
 
 def cerrar_aplicacion(ventana):
+    cerrar_catalogo()
     ventana.quit()
     ventana.destroy()
     import sys
@@ -0,0 +1,16 @@
+# Aplicación de migraciones del esquema compartida por las bases de datos de la aplicación.
+# Cada migración es una función que recibe un cursor; PRAGMA user_version guarda cuántas se
+# aplicaron y cada una corre en su propia transacción.
+
+def migrar(conn, migraciones) -> int:
+    version = conn.execute('PRAGMA user_version').fetchone()[0]
+    for numero, migracion in enumerate(migraciones[version:], start=version + 1):
+        try:
+            conn.execute('BEGIN')
+            migracion(conn.cursor())
+            conn.execute(f'PRAGMA user_version = {numero}')
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+    return max(version, len(migraciones))
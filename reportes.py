@@ -0,0 +1,235 @@
+# PDF del balance general: diseño del documento y generación por lotes sin interfaz gráfica
+import os
+import pathlib
+import re
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import letter
+from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.lib.units import inch
+
+from catalogo import DB_PATH, migrar_base_datos
+from diagnostico import conectar
+from balance import (SECCIONES_BALANCE, SECCIONES_ACTIVO, SECCIONES_PASIVO, cargar_balance_general,
+                     listar_balances_generales, totales_balance_general)
+
+class PdfCancelado(Exception):
+    pass
+
+def construir_pdf_balance(file_path, empresa, fecha, lineas, progreso=None, cancelado=None):
+    # Genera el PDF del balance general a partir de una copia de sus líneas
+    # (seccion, codigo, nombre, monto), sin tocar widgets; puede correr fuera del hilo de Tk.
+    # progreso(fraccion, pagina) informa el avance y cancelado() permite abortar.
+    # ReportLab escribe el archivo al final de build; se construye en un temporal junto al
+    # destino y solo reemplaza al archivo existente si termina bien
+    temporal = f"{file_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    doc = SimpleDocTemplate(
+        temporal,
+        pagesize=letter,
+        rightMargin=72,
+        leftMargin=72,
+        topMargin=72,
+        bottomMargin=72
+    )
+
+    estado = {"total": 1, "pagina": 0}
+
+    def on_progress(tipo, valor):
+        if cancelado is not None and cancelado():
+            raise PdfCancelado()
+        if tipo == "SIZE_EST":
+            estado["total"] = max(valor, 1)
+        elif tipo == "PAGE":
+            estado["pagina"] = valor
+        elif tipo == "PROGRESS" and progreso is not None:
+            progreso(min(valor / estado["total"], 1.0), estado["pagina"])
+
+    doc.setProgressCallBack(on_progress)
+
+    # Lista para almacenar los elementos del PDF
+    elements = []
+
+    # Estilos
+    styles = getSampleStyleSheet()
+    title_style = ParagraphStyle(
+        'CustomTitle',
+        parent=styles['Heading1'],
+        fontSize=16,
+        alignment=1,  # Centrado
+        spaceAfter=30
+    )
+
+    subtitle_style = ParagraphStyle(
+        'CustomSubTitle',
+        parent=styles['Heading2'],
+        fontSize=12,
+        alignment=1,
+        spaceAfter=20
+    )
+
+    # Título y encabezado
+    elements.append(Paragraph(empresa.strip().upper(), title_style))
+    elements.append(Paragraph("BALANCE GENERAL", title_style))
+    elements.append(Paragraph(f"Al {fecha}", subtitle_style))
+    elements.append(Paragraph(f"(Expresado en dólares de los Estados Unidos de América)", subtitle_style))
+    elements.append(Spacer(1, 20))
+
+    # Agrupar las líneas por sección y sumar en centavos
+    filas = {seccion: [] for seccion in SECCIONES_BALANCE.values()}
+    totales = {seccion: 0 for seccion in SECCIONES_BALANCE.values()}
+    for seccion, codigo, nombre, monto in lineas:
+        # Patrimonio se lista solo con el nombre de la cuenta
+        cuenta = nombre if seccion == "patrimonio" else f"{codigo} - {nombre}"
+        filas[seccion].append(["    " + cuenta, f"${monto:,.2f}"])
+        totales[seccion] += round(monto * 100)
+
+    def total(*secciones):
+        return sum(totales[seccion] for seccion in secciones) / 100
+
+    # Recolectar datos de activos
+    activos_data = [["ACTIVOS", "Monto"]]
+
+    if filas["activo_corriente"]:
+        activos_data.append(["ACTIVOS CORRIENTES", ""])
+        activos_data.extend(filas["activo_corriente"])
+        activos_data.append(["Total Activos Corrientes", f"${total('activo_corriente'):,.2f}"])
+
+    if filas["activo_no_corriente"]:
+        activos_data.append(["ACTIVOS NO CORRIENTES", ""])
+        activos_data.extend(filas["activo_no_corriente"])
+        activos_data.append(["Total Activos No Corrientes", f"${total('activo_no_corriente'):,.2f}"])
+
+    # Añadir total de activos al PDF
+    activos_data.append(["TOTAL ACTIVOS", f"${total(*SECCIONES_ACTIVO):,.2f}"])
+
+    # Recolectar datos de pasivos y patrimonio
+    pasivos_patrimonio_data = [["PASIVOS Y PATRIMONIO", "Monto"]]
+
+    if filas["pasivo_corriente"]:
+        pasivos_patrimonio_data.append(["PASIVOS CORRIENTES", ""])
+        pasivos_patrimonio_data.extend(filas["pasivo_corriente"])
+        pasivos_patrimonio_data.append(["Total Pasivos Corrientes", f"${total('pasivo_corriente'):,.2f}"])
+
+    if filas["pasivo_no_corriente"]:
+        pasivos_patrimonio_data.append(["PASIVOS NO CORRIENTES", ""])
+        pasivos_patrimonio_data.extend(filas["pasivo_no_corriente"])
+        pasivos_patrimonio_data.append(["Total Pasivos No Corrientes", f"${total('pasivo_no_corriente'):,.2f}"])
+
+    # Añadir total de pasivos
+    pasivos_patrimonio_data.append(["TOTAL PASIVOS", f"${total(*SECCIONES_PASIVO):,.2f}"])
+
+    if filas["patrimonio"]:
+        pasivos_patrimonio_data.append(["PATRIMONIO", ""])
+        pasivos_patrimonio_data.extend(filas["patrimonio"])
+        pasivos_patrimonio_data.append(["TOTAL PATRIMONIO", f"${total('patrimonio'):,.2f}"])
+
+    # Calcular y añadir total de pasivos y patrimonio
+    total_pasivos_y_patrimonio = total(*SECCIONES_PASIVO, "patrimonio")
+    pasivos_patrimonio_data.append(["TOTAL PASIVOS Y PATRIMONIO", f"${total_pasivos_y_patrimonio:,.2f}"])
+
+    estilo_tabla = TableStyle([
+        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+        ('ALIGN', (1, 0), (1, -1), 'RIGHT'),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, 0), 12),
+        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+        ('TEXTCOLOR', (0, -1), (-1, -1), colors.black),
+        ('FONTNAME', (0, -1), (-1, -1), 'Helvetica-Bold'),
+        ('TOPPADDING', (0, -1), (-1, -1), 12),
+        ('LINEBELOW', (0, -1), (-1, -1), 1, colors.black),
+    ])
+
+    # Crear tabla de activos
+    activos_table = Table(activos_data, colWidths=[4*inch, 2*inch])
+    activos_table.setStyle(estilo_tabla)
+
+    elements.append(activos_table)
+    elements.append(Spacer(1, 20))
+
+    # Crear tabla de pasivos y patrimonio
+    pasivos_patrimonio_table = Table(pasivos_patrimonio_data, colWidths=[4*inch, 2*inch])
+    pasivos_patrimonio_table.setStyle(estilo_tabla)
+
+    elements.append(pasivos_patrimonio_table)
+
+    # Agregar espacio para firmas
+    elements.append(Spacer(1, 50))
+
+    # Crear tabla para firmas
+    firma_data = [
+        ["_______________________", "_______________________", "_______________________"],
+        ["Representante Legal", "Contador", "Auditor"],
+    ]
+    firma_table = Table(firma_data, colWidths=[2.5*inch, 2.5*inch, 2.5*inch])
+    firma_table.setStyle(TableStyle([
+        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+        ('FONTNAME', (0, 1), (-1, 1), 'Helvetica'),
+        ('FONTSIZE', (0, 1), (-1, 1), 10),
+        ('TOPPADDING', (0, 1), (-1, 1), 5),
+    ]))
+
+    elements.append(firma_table)
+
+    # Generar el PDF; si se cancela o falla solo se descarta el temporal
+    try:
+        doc.build(elements)
+        os.replace(temporal, file_path)
+    except BaseException:
+        if os.path.exists(temporal):
+            os.remove(temporal)
+        raise
+
+
+# Conexión de solo lectura propia de cada proceso de trabajo
+_conn = None
+
+def _iniciar_proceso(db_path):
+    global _conn
+    # as_uri() escapa "#", "?", "%" y convierte las barras de Windows
+    _conn = conectar(pathlib.Path(db_path).resolve().as_uri() + "?mode=ro", uri=True)
+
+def nombre_archivo_balance(balance_id, empresa, fecha) -> str:
+    # Nombre determinista: empresa, fecha y el id para que no choquen dos balances iguales
+    empresa = re.sub(r'[^A-Za-z0-9]+', '_', empresa or "").strip('_') or "Empresa"
+    fecha = re.sub(r'[^0-9]+', '_', fecha or "").strip('_') or "sin_fecha"
+    return f"Balance_General_{empresa}_{fecha}_{balance_id}.pdf"
+
+def _renderizar(tarea):
+    balance_id, carpeta = tarea
+    # Un balance que falla queda informado en su resultado sin detener el resto del lote
+    try:
+        guardado = cargar_balance_general(_conn, balance_id)
+        if guardado is None:
+            return balance_id, None, "El balance no existe"
+        fecha, empresa, lineas = guardado
+        # Sin líneas el PDF mostraría todo en cero aunque el encabezado tenga otros totales
+        if not lineas and any(totales_balance_general(_conn, balance_id)):
+            return balance_id, None, "Balance sin detalle: se guardó antes de registrar sus líneas"
+        file_path = os.path.join(carpeta, nombre_archivo_balance(balance_id, empresa, fecha))
+        construir_pdf_balance(file_path, empresa or "", fecha or "", lineas)
+    except Exception as e:
+        return balance_id, None, str(e)
+    return balance_id, file_path, None
+
+def renderizar_balances_guardados(carpeta, db_path=DB_PATH, procesos=None):
+    # Reparte los balances entre un pool de procesos; devuelve [(id, ruta, error)] ordenado por id
+    os.makedirs(carpeta, exist_ok=True)
+    conn = conectar(db_path)
+    try:
+        # Los procesos abren la base de datos en solo lectura: el esquema se pone al día aquí
+        migrar_base_datos(conn)
+        ids = sorted(fila[0] for fila in listar_balances_generales(conn))
+    finally:
+        conn.close()
+    if not ids:
+        return []
+
+    procesos = procesos or os.cpu_count() or 1
+    tareas = [(balance_id, carpeta) for balance_id in ids]
+    # Bloques medianos para repartir la carga sin pagar un viaje entre procesos por balance
+    chunksize = max(1, len(tareas) // (procesos * 4))
+    with ProcessPoolExecutor(max_workers=procesos, initializer=_iniciar_proceso, initargs=(db_path,)) as executor:
+        return list(executor.map(_renderizar, tareas, chunksize=chunksize))
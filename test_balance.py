@@ -0,0 +1,115 @@
+# Pruebas del modelo del balance general y su almacenamiento
+#
+#   python -m pytest -q
+import sqlite3
+
+import pytest
+
+from balance import (BalanceSheet, cargar_balance_general, guardar_balance_general, listar_balances_generales,
+                     totales_balance_general)
+from catalogo import AccountCatalog
+
+@pytest.fixture
+def conn(tmp_path):
+    # Las tablas del balance se crean con las migraciones del catálogo
+    db = AccountCatalog(str(tmp_path / "catalogo.db"))
+    yield db.conn
+    db.close()
+
+def test_totales_incrementales_en_centavos():
+    balance = BalanceSheet()
+    avisos = []
+    balance.on_change = lambda: avisos.append(balance.difference)
+    caja = balance.add_line("activo_corriente")
+    bancos = balance.add_line("activo_corriente")
+    proveedores = balance.add_line("pasivo_corriente")
+
+    # Sumas que en punto flotante no dan exacto
+    balance.update_line(caja, amount_text="0.10")
+    balance.update_line(bancos, amount_text="0.20")
+    balance.update_line(proveedores, amount_text="0.30")
+
+    assert balance.section_total("activo_corriente") == 0.3
+    assert balance.total_activos == 0.3
+    assert balance.total_pasivos == 0.3
+    assert balance.difference == 0
+    assert len(avisos) == 3
+
+    # Cambiar un monto reemplaza su aporte anterior
+    balance.update_line(caja, amount_text="1.15")
+    assert balance.total_activos == 1.35
+    assert balance.difference == 1.05
+
+def test_montos_invalidos_no_suman():
+    balance = BalanceSheet()
+    linea = balance.add_line("patrimonio")
+
+    balance.update_line(linea, amount_text="12.345")
+    assert not linea.valid
+    assert balance.total_patrimonio == 0
+
+    balance.update_line(linea, amount_text=" 12.34 ")
+    assert linea.valid
+    assert linea.cents == 1234
+    assert balance.total_patrimonio == 12.34
+
+def test_quitar_linea_y_limpiar():
+    balance = BalanceSheet()
+    caja = balance.add_line("activo_corriente")
+    edificio = balance.add_line("activo_no_corriente")
+    balance.update_line(caja, amount_text="100")
+    balance.update_line(edificio, amount_text="250.50")
+
+    balance.remove_line(caja)
+    # Quitar dos veces la misma línea no descuenta de nuevo
+    balance.remove_line(caja)
+    assert balance.total_activos == 250.5
+    assert balance.lines() == [edificio]
+
+    balance.clear()
+    assert balance.lines() == []
+    assert balance.total_activos == 0
+
+def test_cuenta_sin_resolver_queda_sin_codigo():
+    catalogo = {("activo_corriente", "1101"): "CAJA"}
+    balance = BalanceSheet(resolve_account=lambda section, code: catalogo.get((section, code)))
+    linea = balance.add_line("activo_corriente")
+
+    balance.update_line(linea, account_text="1101 - otro nombre")
+    assert (linea.code, linea.name) == ("1101", "CAJA")
+
+    # Texto libre o una cuenta de otra sección no se asignan
+    for texto in ("caja", "2101 - PROVEEDORES", ""):
+        balance.update_line(linea, account_text=texto)
+        assert (linea.code, linea.name) == ("", "")
+
+def test_sin_resolver_acepta_cualquier_codigo():
+    balance = BalanceSheet()
+    linea = balance.add_line("pasivo_corriente")
+
+    balance.update_line(linea, account_text="2101 - PROVEEDORES")
+    assert (linea.code, linea.name) == ("2101", "PROVEEDORES")
+
+def test_guardar_y_cargar_balance(conn):
+    lineas = [
+        ("activo_corriente", "1101", "CAJA", 1500.25),
+        ("activo_no_corriente", "1201", "MOBILIARIO", 500.0),
+        ("pasivo_corriente", "2101", "PROVEEDORES", 800.25),
+        ("patrimonio", "3101", "CAPITAL SOCIAL", 1200.0),
+    ]
+    balance_id = guardar_balance_general(conn, "31/12/2024", "Empresa", 2000.25, 800.25, 1200.0, lineas)
+    otro_id = guardar_balance_general(conn, "31/01/2025", "Otra", 0, 0, 0, [])
+
+    # Las líneas vuelven en el orden en que se guardaron
+    assert cargar_balance_general(conn, balance_id) == ("31/12/2024", "Empresa", lineas)
+    assert cargar_balance_general(conn, otro_id) == ("31/01/2025", "Otra", [])
+    assert cargar_balance_general(conn, otro_id + 1) is None
+    assert totales_balance_general(conn, balance_id) == (2000.25, 800.25, 1200.0)
+    assert [fila[0] for fila in listar_balances_generales(conn)] == [otro_id, balance_id]
+
+def test_guardar_balance_es_atomico(conn):
+    # Una línea sin código viola NOT NULL: no queda ni el encabezado
+    with pytest.raises(sqlite3.IntegrityError):
+        guardar_balance_general(conn, "31/12/2024", "Empresa", 1, 0, 1,
+                                [("activo_corriente", "1101", "CAJA", 1.0), ("patrimonio", None, "CAPITAL", 1.0)])
+    assert listar_balances_generales(conn) == []
@@ -0,0 +1,154 @@
+# Pruebas de AccountCatalog sobre una base de datos temporal
+#
+#   python -m pytest -q
+import pytest
+
+from catalogo import Account, AccountCatalog
+
+CUENTAS = [
+    ("11", "ACTIVO CORRIENTE", "1"),
+    ("1101", "CAJA", "11"),
+    ("110101", "Caja General", "1101"),
+    ("110102", "Caja Chica", "1101"),
+    ("1102", "BANCOS", "11"),
+    ("110201", "Banco Nación", "1102"),
+]
+
+@pytest.fixture
+def catalogo(tmp_path):
+    db = AccountCatalog(str(tmp_path / "catalogo.db"))
+    yield db
+    db.close()
+
+def codigos(cuentas):
+    return [cuenta.code for cuenta in cuentas]
+
+def test_recodificar_subarbol(catalogo):
+    catalogo.import_accounts(CUENTAS)
+
+    assert catalogo.editar_cuenta("1101", "1103", "EFECTIVO", "11")
+    assert codigos(catalogo.get_subtree("1103")) == ["1103", "110301", "110302"]
+    assert catalogo.get_subtree("1101") == []
+    assert catalogo.buscar_cuenta_por_codigo("1103") == Account("1103", "EFECTIVO", "11")
+    assert catalogo.buscar_cuenta_por_codigo("110302") == Account("110302", "Caja Chica", "1103")
+    # El índice en memoria y el de texto reflejan la recodificación
+    assert codigos(catalogo.get_descendants("11")) == ["1102", "110201", "1103", "110301", "110302"]
+    assert codigos(catalogo.search_accounts("efectivo")) == ["1103"]
+
+def test_renombrar_solo_modifica_la_cuenta(catalogo):
+    catalogo.import_accounts(CUENTAS)
+    contador = catalogo.change_counter()
+
+    assert catalogo.editar_cuenta("11", "11", "ACTIVO CIRCULANTE", "1")
+    assert catalogo.change_counter() == contador + 1
+    assert catalogo.buscar_cuenta_por_codigo("11") == Account("11", "ACTIVO CIRCULANTE", "1")
+    assert codigos(catalogo.get_subtree("11")) == ["11", "1101", "110101", "110102", "1102", "110201"]
+
+def test_recodificar_subarbol_con_colision_se_deshace(catalogo):
+    catalogo.import_accounts(CUENTAS)
+    # Subcuenta suelta cuyo padre no existe: 110101 pasaría a 110301 y choca con ella
+    # después de que otras filas del subárbol ya se actualizaron
+    assert catalogo.create_account("110301", "HUERFANA", "1103")
+    antes = catalogo.get_all_accounts()
+
+    assert not catalogo.editar_cuenta("1101", "1103", "CAJA", "11")
+    assert catalogo.get_all_accounts() == antes
+
+@pytest.mark.parametrize("nuevo_codigo, nuevo_padre", [("1X01", "11"), ("1X", ""), ("123", ""), ("1201", "11")])
+def test_recodificar_rechaza_codigos_invalidos(catalogo, nuevo_codigo, nuevo_padre):
+    catalogo.import_accounts(CUENTAS)
+    antes = catalogo.get_all_accounts()
+
+    assert not catalogo.editar_cuenta("1101", nuevo_codigo, "CAJA", nuevo_padre)
+    assert catalogo.get_all_accounts() == antes
+
+def test_importar_informa_filas_rechazadas(catalogo):
+    resultado = catalogo.import_accounts([
+        ("codigo", "nombre", "padre"),
+        ("11", "ACTIVO CORRIENTE", "1"),
+        ("1101", "", "11"),
+        ("11A1", "CAJA", "11"),
+        ("11", "REPETIDA", "1"),
+        ("110101", "CAJA GENERAL", "1101"),
+        ("1102", "BANCOS", "11"),
+    ], chunk_size=1)
+
+    assert resultado.imported == 2
+    assert resultado.read_error is None
+    assert resultado.errors == [
+        (3, "1101", "El nombre es obligatorio"),
+        (4, "11A1", "Formato de código inválido"),
+        (5, "11", "El código ya existe"),
+        (6, "110101", "El código padre no existe"),
+    ]
+
+def test_importar_conserva_lo_leido_si_falla_el_origen(catalogo):
+    cambios = []
+    catalogo.subscribe(cambios.extend)
+    # Se consulta antes para que el índice en memoria ya esté cargado
+    assert catalogo.get_descendants("11") == []
+
+    def filas():
+        yield "11", "ACTIVO CORRIENTE", "1"
+        yield "1101", "CAJA", "11"
+        raise OSError("disco desconectado")
+
+    resultado = catalogo.import_accounts(filas(), chunk_size=1)
+
+    assert resultado.imported == 2
+    assert resultado.read_error == "disco desconectado"
+    assert [cambio.kind for cambio in cambios] == ["reset"]
+    assert codigos(catalogo.get_descendants("1")) == ["11", "1101"]
+
+def test_importar_csv_con_encabezado(catalogo, tmp_path):
+    archivo = tmp_path / "cuentas.csv"
+    archivo.write_text("codigo,nombre,padre\n11,ACTIVO CORRIENTE,1\n1101,CAJA,11\n", encoding="utf-8")
+
+    resultado = catalogo.import_accounts(str(archivo))
+
+    assert (resultado.imported, resultado.errors, resultado.read_error) == (2, [], None)
+
+def test_importar_archivo_inexistente(catalogo, tmp_path):
+    resultado = catalogo.import_accounts(str(tmp_path / "no_existe.csv"))
+
+    assert resultado.imported == 0
+    assert resultado.read_error
+
+def test_eventos_de_alta_edicion_y_baja(catalogo):
+    catalogo.import_accounts(CUENTAS)
+    cambios = []
+    catalogo.subscribe(cambios.extend)
+
+    assert catalogo.create_account("1103", "INVERSIONES", "11")
+    assert catalogo.editar_cuenta("1103", "1103", "INVERSIONES TEMPORALES", "11")
+    assert catalogo.eliminar_cuenta("1103")
+
+    assert [(cambio.kind, cambio.code) for cambio in cambios] == [
+        ("inserted", "1103"), ("updated", "1103"), ("deleted", "1103")]
+    assert cambios[0].account == Account("1103", "INVERSIONES", "11")
+    assert cambios[1].account == Account("1103", "INVERSIONES TEMPORALES", "11")
+    assert cambios[1].previous == Account("1103", "INVERSIONES", "11")
+    assert cambios[2].previous == Account("1103", "INVERSIONES TEMPORALES", "11")
+    assert codigos(catalogo.get_descendants("11")) == codigos(Account(*fila) for fila in CUENTAS[1:])
+
+def test_eventos_recodificar_subarbol_y_fallos(catalogo):
+    catalogo.import_accounts(CUENTAS)
+    cambios = []
+    catalogo.subscribe(cambios.extend)
+
+    # Una sola cuenta recodificada es una edición; un subárbol completo pide recargar
+    assert catalogo.editar_cuenta("110201", "110202", "Banco Nación", "1102")
+    assert catalogo.editar_cuenta("1101", "1103", "CAJA", "11")
+    # Lo que no cambia nada no se publica
+    assert not catalogo.create_account("11", "REPETIDA", "1")
+    assert not catalogo.eliminar_cuenta("9999")
+
+    assert [(cambio.kind, cambio.code) for cambio in cambios] == [("updated", "110201"), ("reset", None)]
+
+def test_desuscribir(catalogo):
+    cambios = []
+    oyente = catalogo.subscribe(cambios.extend)
+    catalogo.unsubscribe(oyente)
+
+    assert catalogo.create_account("11", "ACTIVO CORRIENTE", "1")
+    assert cambios == []
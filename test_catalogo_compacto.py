@@ -0,0 +1,43 @@
+# Pruebas del catálogo compacto: mismo resultado que AccountPrefixIndex al leerlo del archivo
+#
+#   python -m pytest -q
+import pytest
+
+from catalogo import Account, AccountPrefixIndex
+from catalogo_compacto import CatalogoCompacto
+
+FILAS = [
+    ("1", "ACTIVO", None),
+    ("11", "ACTIVO CORRIENTE", "1"),
+    ("1101", "CAJA", "11"),
+    ("110101", "Caja General", "1101"),
+    ("110102", "Caja Chica", "1101"),
+    ("1102", "BANCOS", "11"),
+    ("110201", "Banco Nación – cuenta corriente", "1102"),
+    ("12", "ACTIVO NO CORRIENTE", "1"),
+    ("1201", "MOBILIARIO Y EQUIPO", "12"),
+    # Padre que no está en el catálogo
+    ("2101", "PROVEEDORES", "21"),
+]
+
+@pytest.mark.parametrize("prefix, text", [
+    ("", ""), ("1", ""), ("11", ""), ("11", "caja"), ("1", "CAJA CH"), ("1", "1101"),
+    ("11", "1"), ("12", "11"), ("1", "nación"), ("1", "no existe"), ("21", ""), ("", "proveedores"),
+])
+def test_catalogo_compacto_ida_y_vuelta(tmp_path, prefix, text):
+    ruta = str(tmp_path / "catalogo.snapshot")
+    CatalogoCompacto.desde_filas(FILAS, version=7).escribir(ruta)
+    compacto = CatalogoCompacto.abrir(ruta, 7)
+    indice = AccountPrefixIndex(Account(*fila) for fila in FILAS)
+
+    assert [Account(*fila) for fila in compacto.matching(prefix, text)] == list(indice.matching(prefix, text))
+    assert [compacto.fila(i) for i in range(len(compacto))] == FILAS
+
+def test_catalogo_compacto_rechaza_otra_version_o_archivo_danado(tmp_path):
+    ruta = tmp_path / "catalogo.snapshot"
+    CatalogoCompacto.desde_filas(FILAS, version=7).escribir(str(ruta))
+    assert CatalogoCompacto.abrir(str(ruta), 8) is None
+
+    ruta.write_bytes(ruta.read_bytes()[:-1])
+    assert CatalogoCompacto.abrir(str(ruta), 7) is None
+    assert CatalogoCompacto.abrir(str(tmp_path / "no_existe"), 7) is None
@@ -0,0 +1,93 @@
+# Pruebas de las operaciones de base de datos de codigoPrueba (contabilidad.db)
+#
+#   python -m pytest -q
+import sqlite3
+
+import pytest
+
+import codigoPrueba
+
+@pytest.fixture
+def mensajes(tmp_path, monkeypatch):
+    # contabilidad.db se abre en el directorio actual; los cuadros de diálogo se registran
+    monkeypatch.chdir(tmp_path)
+    registrados = []
+    monkeypatch.setattr(codigoPrueba.messagebox, "showerror", lambda *args: registrados.append(("error",) + args))
+    monkeypatch.setattr(codigoPrueba.messagebox, "showinfo", lambda *args: registrados.append(("info",) + args))
+    codigoPrueba.cuentas_renombradas.clear()
+    codigoPrueba.migrar_base_datos()
+    yield registrados
+    codigoPrueba.cerrar_conexion()
+
+def filas_guardadas(tmp_path):
+    # Con otra conexión, para ver solo lo confirmado
+    conn = sqlite3.connect(tmp_path / "contabilidad.db")
+    try:
+        return conn.execute("SELECT nombre, tipo, monto FROM cuentas_balance ORDER BY id").fetchall()
+    finally:
+        conn.close()
+
+def test_unidad_de_trabajo_confirma_al_salir(mensajes, tmp_path):
+    with codigoPrueba.unidad_de_trabajo() as conn:
+        conn.execute("INSERT INTO cuentas_balance (nombre, tipo, monto) VALUES ('CAJA', 'Capital', 1)")
+        # Una unidad anidada y ejecutar_db no confirman por su cuenta
+        with codigoPrueba.unidad_de_trabajo():
+            codigoPrueba.ejecutar_db("INSERT INTO cuentas_balance (nombre, tipo, monto) VALUES ('BANCO', 'Capital', 2)")
+        assert filas_guardadas(tmp_path) == []
+
+    assert filas_guardadas(tmp_path) == [("CAJA", "Capital", 1.0), ("BANCO", "Capital", 2.0)]
+
+def test_unidad_de_trabajo_deshace_si_hay_error(mensajes, tmp_path):
+    with pytest.raises(RuntimeError):
+        with codigoPrueba.unidad_de_trabajo() as conn:
+            conn.execute("INSERT INTO cuentas_balance (nombre, tipo, monto) VALUES ('CAJA', 'Capital', 1)")
+            with codigoPrueba.unidad_de_trabajo():
+                raise RuntimeError("falla")
+
+    assert filas_guardadas(tmp_path) == []
+    # La conexión queda lista para la siguiente operación
+    codigoPrueba.ejecutar_db("INSERT INTO cuentas_balance (nombre, tipo, monto) VALUES ('BANCO', 'Capital', 2)")
+    assert filas_guardadas(tmp_path) == [("BANCO", "Capital", 2.0)]
+
+def test_guardar_cuenta_rechaza_nombre_repetido(mensajes, tmp_path):
+    cambios = []
+    codigoPrueba.oyentes_cuentas.append(lambda *cambio: cambios.append(cambio))
+    try:
+        codigoPrueba.guardar_cuenta("CAJA", "Activos circulantes", 100.0)
+        codigoPrueba.guardar_cuenta("CAJA", "Capital", 5.0)
+    finally:
+        codigoPrueba.oyentes_cuentas.clear()
+
+    assert filas_guardadas(tmp_path) == [("CAJA", "Activos circulantes", 100.0)]
+    assert [mensaje[0] for mensaje in mensajes] == ["info", "error"]
+    assert cambios == [("inserted", "CAJA", ("CAJA", "Activos circulantes", 100.0))]
+
+def test_editar_cuenta_a_nombre_existente(mensajes, tmp_path):
+    codigoPrueba.guardar_cuenta("CAJA", "Activos circulantes", 100.0)
+    codigoPrueba.guardar_cuenta("BANCO", "Activos circulantes", 200.0)
+
+    assert not codigoPrueba.editar_cuenta("BANCO", "CAJA", "Capital", 1.0)
+    assert not codigoPrueba.editar_cuenta("NO EXISTE", "OTRA", "Capital", 1.0)
+    assert codigoPrueba.editar_cuenta("BANCO", "BANCOS", "Capital", 1.0)
+    assert filas_guardadas(tmp_path) == [("CAJA", "Activos circulantes", 100.0), ("BANCOS", "Capital", 1.0)]
+
+def test_migracion_renombra_repetidos(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    conn = sqlite3.connect(tmp_path / "contabilidad.db")
+    conn.execute("CREATE TABLE cuentas_balance (id INTEGER PRIMARY KEY AUTOINCREMENT, nombre TEXT NOT NULL, "
+                 "tipo TEXT NOT NULL, monto REAL NOT NULL)")
+    conn.executemany("INSERT INTO cuentas_balance (nombre, tipo, monto) VALUES (?, 'Capital', ?)",
+                     [("CAJA", 1), ("CAJA", 2), ("CAJA (2)", 3), ("BANCO", 4)])
+    conn.execute("PRAGMA user_version = 1")
+    conn.commit()
+    conn.close()
+    codigoPrueba.cuentas_renombradas.clear()
+    try:
+        codigoPrueba.migrar_base_datos()
+    finally:
+        codigoPrueba.cerrar_conexion()
+
+    # No se pierde ninguna fila
+    assert [(nombre, monto) for nombre, _, monto in filas_guardadas(tmp_path)] == [
+        ("CAJA", 1.0), ("CAJA (3)", 2.0), ("CAJA (2)", 3.0), ("BANCO", 4.0)]
+    assert codigoPrueba.cuentas_renombradas == [("CAJA", "CAJA (3)")]